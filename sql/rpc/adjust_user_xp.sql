@@ -0,0 +1,54 @@
+-- adjust_user_xp(p_user_id bigint, p_guild_id bigint, p_delta integer, p_reset boolean)
+--   -> table(old_xp integer, old_level integer, new_xp integer, new_level integer)
+--
+-- Admin XP change as one read-modify-write (database.adjust_user_xp). Under a row
+-- lock, sets xp = greatest(0, xp + p_delta), or 0 when p_reset, and level to the
+-- matching level_from_xp(xp), then returns the XP and level from before and after
+-- the change. A missing row reads as 0 XP; it is only created for a positive delta.
+-- Requires level_from_xp.sql.
+
+drop function if exists public.adjust_user_xp(bigint, bigint, integer, boolean);
+
+create or replace function public.adjust_user_xp(
+  p_user_id bigint,
+  p_guild_id bigint,
+  p_delta integer,
+  p_reset boolean default false
+)
+returns table (old_xp integer, old_level integer, new_xp integer, new_level integer)
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if p_delta > 0 and not p_reset then
+    insert into users (user_id, guild_id, xp, level)
+    values (p_user_id, p_guild_id, 0, 0)
+    on conflict (user_id, guild_id) do nothing;
+  end if;
+
+  select u.xp, u.level into old_xp, old_level
+  from users u
+  where u.user_id = p_user_id and u.guild_id = p_guild_id
+  for update;
+
+  if not found then
+    old_xp := 0;
+    old_level := 0;
+    new_xp := 0;
+    new_level := 0;
+    return next;
+    return;
+  end if;
+
+  new_xp := case when p_reset then 0 else greatest(0, old_xp + p_delta) end;
+  new_level := level_from_xp(new_xp);
+
+  update users u
+     set xp = new_xp,
+         level = new_level
+   where u.user_id = p_user_id and u.guild_id = p_guild_id;
+
+  return next;
+end;
+$$;
@@ -0,0 +1,56 @@
+-- bulk_add_xp(p_rows jsonb, p_batch_id uuid) -> void
+--
+-- Applies one flush of the leveling cog's buffered XP gains (database.bulk_add_xp).
+-- p_rows is a JSON array of {"guild_id", "user_id", "delta", "day"}, at most one
+-- row per (guild_id, user_id, day). In one transaction:
+--   * users: upsert each user with xp = xp + (sum of their deltas) and
+--     level = level_from_xp(xp), so the level always matches the stored XP, even
+--     next to a concurrent adjust_user_xp;
+--   * daily_xp: add each delta to the row for `day`, the ET calendar date the XP was
+--     earned (today's ET date if a row has none), so gains flushed after midnight
+--     still count toward the day they belong to.
+-- p_batch_id is recorded in xp_flush_batches in the same transaction. The bot resends
+-- a failed batch under the same id, so a batch that committed after the bot's call
+-- timed out is skipped instead of being applied twice. Ids older than a day are pruned.
+-- Requires unique keys users(user_id, guild_id) and daily_xp(guild_id, user_id, date),
+-- and level_from_xp.sql.
+
+create table if not exists public.xp_flush_batches (
+  batch_id uuid primary key,
+  applied_at timestamptz not null default now()
+);
+
+drop function if exists public.bulk_add_xp(jsonb);
+
+create or replace function public.bulk_add_xp(p_rows jsonb, p_batch_id uuid)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_today date := (now() at time zone 'America/New_York')::date;
+begin
+  insert into xp_flush_batches (batch_id) values (p_batch_id)
+  on conflict (batch_id) do nothing;
+  if not found then
+    return;  -- this batch already committed
+  end if;
+
+  delete from xp_flush_batches where applied_at < now() - interval '1 day';
+
+  insert into users (user_id, guild_id, xp, level)
+  select r.user_id, r.guild_id, sum(r.delta)::integer, level_from_xp(sum(r.delta))
+  from jsonb_to_recordset(p_rows) as r(guild_id bigint, user_id bigint, delta integer)
+  group by r.user_id, r.guild_id
+  on conflict (user_id, guild_id) do update
+    set xp = users.xp + excluded.xp,
+        level = level_from_xp(users.xp + excluded.xp);
+
+  insert into daily_xp (guild_id, user_id, date, xp_gain)
+  select r.guild_id, r.user_id, coalesce(r.day, v_today), r.delta
+  from jsonb_to_recordset(p_rows) as r(guild_id bigint, user_id bigint, delta integer, day date)
+  on conflict (guild_id, user_id, date) do update
+    set xp_gain = daily_xp.xp_gain + excluded.xp_gain;
+end;
+$$;
@@ -0,0 +1,49 @@
+-- claim_daily_awards(p_date date, p_guilds jsonb)
+--   -> table(guild_id bigint, user_id bigint, xp_gain integer)
+--
+-- Settles one ET calendar date for the daily XP award (database.claim_daily_awards).
+-- p_guilds is a JSON array of {"guild_id", "channel_id"}. In one statement:
+--   * picks each listed guild's top daily_xp row for p_date (ties: lowest user_id);
+--   * stages it in daily_award_outbox (upsert on (guild_id, target_date), the
+--     announce channel kept in payload.channel_id); an already announced row is
+--     left alone and not returned;
+--   * deletes p_date's daily_xp rows for the listed guilds.
+-- Returns one row per guild whose winner was staged.
+
+create or replace function public.claim_daily_awards(p_date date, p_guilds jsonb)
+returns table (guild_id bigint, user_id bigint, xp_gain integer)
+language sql
+security definer
+set search_path = public
+as $$
+  with g as (
+    select * from jsonb_to_recordset(p_guilds) as g(guild_id bigint, channel_id bigint)
+  ),
+  top as (
+    select distinct on (d.guild_id) d.guild_id, d.user_id, d.xp_gain, g.channel_id
+    from daily_xp d
+    join g on g.guild_id = d.guild_id
+    where d.date = p_date
+    order by d.guild_id, d.xp_gain desc, d.user_id
+  ),
+  staged as (
+    insert into daily_award_outbox (guild_id, target_date, user_id, xp_gain, payload)
+    select t.guild_id, p_date, t.user_id, t.xp_gain,
+           jsonb_build_object('channel_id', t.channel_id)
+    from top t
+    on conflict (guild_id, target_date) do update
+      set user_id = excluded.user_id,
+          xp_gain = excluded.xp_gain,
+          payload = excluded.payload
+      where daily_award_outbox.announced_at is null
+    returning daily_award_outbox.guild_id,
+              daily_award_outbox.user_id,
+              daily_award_outbox.xp_gain
+  ),
+  cleared as (
+    delete from daily_xp d
+    using g
+    where d.guild_id = g.guild_id and d.date = p_date
+  )
+  select s.guild_id, s.user_id, s.xp_gain from staged s;
+$$;
@@ -0,0 +1,33 @@
+-- level_from_xp(p_xp bigint) -> integer
+--
+-- The bot's level curve (utility.level_utils.level_from_xp) on the server, so RPCs
+-- that change XP store the matching level in the same statement. Level n needs
+-- floor(100 * n ^ 1.3) total XP; keep both sides in step when the curve changes.
+-- Run this file before adjust_user_xp.sql and bulk_add_xp.sql, which call it.
+
+create or replace function public.level_from_xp(p_xp bigint)
+returns integer
+language plpgsql
+immutable
+set search_path = public
+as $$
+declare
+  v_level integer;
+begin
+  if p_xp <= 0 then
+    return 0;
+  end if;
+
+  -- estimate by inverting the curve, then step onto the exact threshold the bot
+  -- uses (double precision, like Python's float pow)
+  v_level := floor(power(p_xp / 100.0::double precision, 1 / 1.3::double precision));
+  while v_level > 0
+    and floor(100 * power(v_level::double precision, 1.3::double precision)) > p_xp loop
+    v_level := v_level - 1;
+  end loop;
+  while floor(100 * power((v_level + 1)::double precision, 1.3::double precision)) <= p_xp loop
+    v_level := v_level + 1;
+  end loop;
+  return v_level;
+end;
+$$;
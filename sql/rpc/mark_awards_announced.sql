@@ -0,0 +1,21 @@
+-- mark_awards_announced(p_rows jsonb) -> void
+--
+-- Marks a drain pass of award announcements in one update (database.mark_awards_announced).
+-- p_rows is a JSON array of {"guild_id", "target_date", "message_id"}; each matching
+-- daily_award_outbox row still pending gets announced_at = now() and the message id
+-- (0 when nothing was posted). Rows already announced are left untouched.
+
+create or replace function public.mark_awards_announced(p_rows jsonb)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+  update daily_award_outbox o
+     set announced_at = now(),
+         message_id = r.message_id
+    from jsonb_to_recordset(p_rows) as r(guild_id bigint, target_date date, message_id bigint)
+   where o.guild_id = r.guild_id
+     and o.target_date = r.target_date
+     and o.announced_at is null;
+$$;
@@ -1,6 +1,7 @@
 # src/cogs/giveaway.py
 
 import asyncio
+import heapq
 import random
 from datetime import datetime, timedelta, timezone
 from typing import Optional
@@ -14,7 +15,7 @@ from helpers.giveaway_helper import fetch_member_safe
 from helpers.logging_helper import add_throttle, get_logger
 from utility.giveaway_utils import parse_message_id, parse_utc_iso
 from views.giveaway_view import GiveawayView
-from data import database as db
+from data import giveaways as db
 
 
 logger = get_logger("giveaway")
@@ -43,6 +44,12 @@ class Giveaway(commands.Cog, name="Giveaway"):
         except Exception:
             logger.exception("Failed to cancel _update_tasks")
 
+        # don't drop entries still waiting for their batched insert
+        try:
+            await db.flush_entries()
+        except Exception:
+            logger.exception("Failed to write queued giveaway entries on unload")
+
     # --- Private Functions ---
     def _find_field_index(self, embed: discord.Embed, name_prefix: str) -> int | None:
         """Case-insensitive search by field name prefix, returns index or None."""
@@ -78,15 +85,14 @@ class Giveaway(commands.Cog, name="Giveaway"):
         return embed
 
     def _weights_for(self, entrants: list[discord.Member]) -> list[int]:
-        weights = []
-        for member in entrants:
-            weight = config.DEFAULT_WEIGHT
-            if member.roles:
-                weight = max(
-                    [weight] + [config.ROLE_WEIGHTS.get(r.id, 0) for r in member.roles]
-                )
-            weights.append(weight)
-        return weights
+        role_weights = config.ROLE_WEIGHTS
+        default = config.DEFAULT_WEIGHT
+        return [
+            max(default, *(role_weights.get(r.id, 0) for r in member.roles))
+            if member.roles
+            else default
+            for member in entrants
+        ]
 
     def _pick_winners(
         self, entrants: list[discord.Member], weights: list[int], k: int
@@ -95,22 +101,13 @@ class Giveaway(commands.Cog, name="Giveaway"):
         if k <= 0:
             return []
 
-        pool = list(zip(entrants, weights))
-        total = sum(w for _, w in pool)
-        winners: list[discord.Member] = []
-        for _ in range(k):
-            if total <= 0:
-                break
-            r = random.uniform(0, total)
-            upto = 0.0
-            for i, (m, w) in enumerate(pool):
-                upto += w
-                if upto >= r:
-                    winners.append(m)
-                    pool.pop(i)
-                    total -= w
-                    break
-        return winners
+        # Weighted draw without replacement in one pass (Efraimidis-Spirakis):
+        # each entrant gets key u ** (1 / w) and the k largest keys win. Same odds
+        # as drawing one winner at a time and removing them from the pool.
+        keyed = (
+            (random.random() ** (1.0 / w), i) for i, w in enumerate(weights) if w > 0
+        )
+        return [entrants[i] for _, i in heapq.nlargest(k, keyed)]
 
     async def _get_message_channel(
         self, channel_id: int
@@ -213,6 +210,9 @@ class Giveaway(commands.Cog, name="Giveaway"):
 
             ctx = {"gid": g["guild_id"], "cid": g["channel_id"], "mid": g["message_id"]}
 
+            # queued entries go in before the flip; if they can't, the giveaway
+            # stays active and is retried next tick instead of drawn short
+            await db.flush_entries()
             flipped = await db.end_giveaway(g["message_id"])
             if not flipped:
                 return
@@ -456,7 +456,7 @@ class Giveaway(commands.Cog, name="Giveaway"):
                         "⚠️ Giveaway setup failed.", ephemeral=True
                     )
                 else:
-                    await interaction.response.defer(
+                    await interaction.response.send_message(
                         "⚠️ Giveaway setup failed.", ephemeral=True
                     )
             except Exception:
@@ -1,10 +1,15 @@
 import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
 import time
-import random
-from datetime import datetime, timedelta, time as dt_time
-from typing import Optional, Tuple
-from zoneinfo import ZoneInfo
-from PIL import Image, ImageOps
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+from datetime import date, datetime, timedelta, time as dt_time
+from typing import Optional
 
 #
 import discord
@@ -14,18 +19,21 @@ from discord import app_commands
 #
 import config
 from utility import image_utils
+from utility.cache_utils import TTLCache
 from utility.level_utils import (
+    LevelupBannerJob,
     RankCardData,
     xp_for_level,
     level_from_xp,
     XpResult,
 )
 from helpers import banner_helper
-from helpers.level_helper import fetch_banner_bytes
+from helpers.level_helper import fetch_banner_bytes, fetch_head_bytes
 from helpers.logging_helper import get_logger, add_throttle
+from helpers.xp_buffer import ET, XP_FLUSH_SECONDS, XpBuffer
 from data import database
 from views.confirmation_view import ConfirmView
-from views.leaderboard_view import LeaderboardView
+from views.leaderboard_view import LEADERBOARD_PAGE_SIZE, LeaderboardView
 
 
 log = get_logger("leveling")
@@ -35,17 +43,75 @@ add_throttle(xp_logger, 60)
 heartbeat = get_logger("leveling.heartbeat")
 add_throttle(heartbeat, 300)
 
-ET = ZoneInfo("America/New_York")
+_HEX_COLOR = re.compile(r"#[0-9a-fA-F]{6}").fullmatch
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}", re.ASCII).fullmatch
 
+# Rank cards are re-served from memory for a short while; total XP is bucketed
+# so a card is not invalidated by every single message.
+RANK_CARD_TTL = 60.0
+RANK_CARD_XP_BUCKET = 50
 
-class Leveling(commands.Cog, name="Leveling"):
+# The leaderboard's first page is shared by every /leaderboard call for a minute.
+LEADERBOARD_TTL = 60.0
+
+# Cooldown deadlines are pruned on a timer, or early if a burst overfills them.
+COOLDOWN_PRUNE_MINUTES = 30
+COOLDOWN_MAX_ENTRIES = 200_000
+
+# Guilds handled at once by the daily award jobs (keeps Discord rate limits sane).
+DAILY_AWARD_CONCURRENCY = 8
+# Role removals in flight per guild during the daily handover.
+ROLE_EDIT_CONCURRENCY = 5
+
+# Uploaded banners are resized/encoded in worker processes, not on the loop's threads.
+# Uploads are rare, so a large host still gets at most a handful of workers.
+BANNER_POOL_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+# Per-guild settings, config snapshots and caches are each read on a hot path
+# (on_message, /rank, /leaderboard), so they stay plain attributes; the XP
+# buffer and level-up banner pipeline are already grouped into helpers.
+class Leveling(commands.Cog, name="Leveling"):  # pylint: disable=too-many-instance-attributes
     def __init__(self, bot: commands.Bot, *, auto_start_loops: bool = True):
         self.bot = bot
-        self._last_xp = {}
+        self._cooldown_until: dict[tuple[int, int], float] = {}  # monotonic deadlines
         self.guild_cooldowns = {}
         self.guild_xp_ranges = {}
         self.guild_levelup_channels = {}
 
+        # static config snapshotted once; these are read on every message
+        self._excluded_channels = frozenset(config.EXCLUDED_CHANNELS or ())
+        self._default_cooldown = config.DEFAULT_XP_COOLDOWN
+        self._default_xp_range = tuple(config.DEFAULT_XP_RANGE)
+        self._role_rewards: dict[int, int] = dict(config.ROLE_REWARDS)
+        self._daily_announce: dict[int, int] = dict(
+            getattr(config, "DAILY_ANNOUNCE_CHANNEL", {}) or {}
+        )
+
+        # guild_id -> resolved (daily XP role, announce channel) for the award jobs
+        self._daily_award_ctx: dict[
+            int, tuple[discord.Role, Optional[discord.abc.GuildChannel]]
+        ] = {}
+
+        self._rank_cards: TTLCache[bytes] = TTLCache(maxsize=1024, ttl=RANK_CARD_TTL)
+        # guild_id -> (first leaderboard page, total rows)
+        self._leaderboards: TTLCache[tuple[list, int]] = TTLCache(
+            maxsize=1024, ttl=LEADERBOARD_TTL
+        )
+        # level-up banners, rendered and sent by background workers
+        self._levelup = banner_helper.LevelupBanners()
+
+        # running totals and buffered gains, written in batches by flush_xp; admin
+        # XP commands flush it and drop cached totals around their own writes
+        self.xp_buffer = XpBuffer()
+
+        # worker processes are only spawned on the first banner upload; "spawn"
+        # keeps them from inheriting the bot's threads, sockets and event loop
+        self._banner_pool = ProcessPoolExecutor(
+            max_workers=BANNER_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
         # background loop state
         self._loops_started = False
         self._start_on_ready = False
@@ -69,13 +135,18 @@ class Leveling(commands.Cog, name="Leveling"):
         # these are @tasks.loop-decorated objects created at class load time
         self.daily_award_stage_task.start()
         self.drain_award_outbox.start()
+        self.flush_xp.start()
+        self.prune_cooldowns.start()
+        self._levelup.start()
         self._loops_started = True
 
     async def cog_unload(self):
-        # Cancel both loops on unload/reload
+        # Cancel the loops on unload/reload
         for loop_task in (
             getattr(self, "daily_award_stage_task", None),
             getattr(self, "drain_award_outbox", None),
+            getattr(self, "flush_xp", None),
+            getattr(self, "prune_cooldowns", None),
         ):
             try:
                 if loop_task and loop_task.is_running():
@@ -84,6 +155,12 @@ class Leveling(commands.Cog, name="Leveling"):
                 log.exception(
                     "Failed to cancel loop %s", getattr(loop_task, "__name__", "<loop>")
                 )
+        self._levelup.stop()
+
+        self._banner_pool.shutdown(wait=False, cancel_futures=True)
+
+        # don't drop XP that is still buffered
+        await self.xp_buffer.flush()
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -92,11 +169,15 @@ class Leveling(commands.Cog, name="Leveling"):
             self._start_background_tasks()
 
         try:
-            self.guild_cooldowns = await database.get_all_cooldowns()
-            self.guild_xp_ranges = await database.get_all_xp_ranges()
+            # One settings dump, fanned out locally into the three lookups
+            all_settings = await database.get_all_guild_settings()
+            self.guild_cooldowns = await database.get_all_cooldowns(all_settings)
+            self.guild_xp_ranges = await database.get_all_xp_ranges(all_settings)
             log.info("Loaded XP ranges for %d guilds.", len(self.guild_xp_ranges))
 
-            all_channel_settings = await database.get_all_channel_settings()
+            all_channel_settings = await database.get_all_channel_settings(
+                all_settings
+            )
             for guild_id, settings in all_channel_settings.items():
                 if settings.get("levelup"):
                     self.guild_levelup_channels[guild_id] = settings["levelup"]
@@ -106,6 +187,15 @@ class Leveling(commands.Cog, name="Leveling"):
             )
             log.info("Loaded cooldowns for %d guilds.", len(self.guild_cooldowns))
 
+            # Warm the daily-award role/channel cache before the first drain
+            for guild in self.bot.guilds:
+                try:
+                    await self._daily_award_targets(
+                        guild, self._daily_announce.get(guild.id)
+                    )
+                except Exception:
+                    log.warning("Award role/channel warm-up failed for %s", guild.id)
+
             # Catch-up (optional): if yesterday has rows, stage & immediately try to drain once.
             ystr = (datetime.now(ET).date() - timedelta(days=1)).isoformat()
             if await database.daily_xp_exists(ystr):
@@ -121,63 +211,94 @@ class Leveling(commands.Cog, name="Leveling"):
         except Exception:
             log.exception("Failed to load leveling settings on_ready")
 
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self._daily_award_ctx.pop(role.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self._daily_award_ctx.pop(channel.guild.id, None)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if (
             message.author.bot
             or not message.guild
-            or message.channel.id in config.EXCLUDED_CHANNELS
+            or message.channel.id in self._excluded_channels
         ):
             return
 
+        # Most messages are inside the cooldown: reject them here without creating
+        # the _process_xp_gain coroutine (which re-checks and arms the cooldown).
+        until = self._cooldown_until.get((message.guild.id, message.author.id))
+        if until is not None and time.monotonic() < until:
+            return
+
         try:
             res = await self._process_xp_gain(message)
-            if res and res.leveled_up:
+            if res:
                 await self._announce_levelup(message, res.new_level)
         except Exception:
             log.exception("Error processing XP gain for message %s", message.id)
 
     # pylint: disable=too-many-locals
     async def _process_xp_gain(self, message: discord.Message) -> XpResult | None:
-        """Apply cooldown, award XP, persist, and return level-change info (or None if skipped)."""
-        user_id = message.author.id
+        """
+        Apply cooldown and buffer the XP award. Returns an XpResult only when the
+        user levels up; None when skipped by cooldown or when the level is unchanged.
+        """
         guild_id = message.guild.id
+        key = (guild_id, message.author.id)
 
-        xp_range = self.guild_xp_ranges.get(guild_id, config.DEFAULT_XP_RANGE)
-        cooldown = self.guild_cooldowns.get(guild_id, config.DEFAULT_XP_COOLDOWN)
-
-        now = time.time()
-        key = (guild_id, user_id)
-        last = self._last_xp.get(key, 0.0)
-        if now - last < cooldown:
+        # Cooldown first: most messages stop here
+        now = time.monotonic()
+        until = self._cooldown_until.get(key)
+        if until is not None and now < until:
             return None
-        self._last_xp[key] = now
+        self._cooldown_until[key] = now + self.guild_cooldowns.get(
+            guild_id, self._default_cooldown
+        )
+        if len(self._cooldown_until) > COOLDOWN_MAX_ENTRIES:
+            self._prune_cooldowns(now)
 
-        xp_gain = random.randint(*xp_range)
+        user_id = message.author.id
+        xp_gain = self.xp_buffer.roll(
+            self.guild_xp_ranges.get(guild_id, self._default_xp_range)
+        )
+        if xp_gain <= 0:
+            return None
 
-        user_data = await database.get_user(user_id, guild_id)
-        current_xp, _stored_level = user_data if user_data else (0, 0)
+        current_xp, new_total_xp = await self.xp_buffer.add(key, xp_gain)
         current_level = level_from_xp(current_xp)
-
-        new_total_xp = current_xp + xp_gain
         new_level = level_from_xp(new_total_xp)
 
-        await database.set_user_xp_and_level(user_id, guild_id, new_total_xp, new_level)
-        await database.increment_daily_xp(user_id, guild_id, xp_gain)
-
-        leveled_up = new_level > current_level
-        xp_logger.debug(
-            "XP processed: user=%s guild=%s gain=%s total=%s lvl=%s->%s",
-            user_id,
-            guild_id,
-            xp_gain,
-            new_total_xp,
-            current_level,
-            new_level,
-        )
-        return XpResult(
-            leveled_up=leveled_up, new_level=new_level, old_level=current_level
-        )
+        if xp_logger.isEnabledFor(logging.DEBUG):
+            xp_logger.debug(
+                "XP processed: user=%s guild=%s gain=%s total=%s lvl=%s->%s",
+                user_id,
+                guild_id,
+                xp_gain,
+                new_total_xp,
+                current_level,
+                new_level,
+            )
+        if new_level <= current_level:
+            return None
+        return XpResult(leveled_up=True, new_level=new_level, old_level=current_level)
+
+    @tasks.loop(seconds=XP_FLUSH_SECONDS)
+    async def flush_xp(self):
+        await self.xp_buffer.flush_due()
+
+    @tasks.loop(minutes=COOLDOWN_PRUNE_MINUTES)
+    async def prune_cooldowns(self):
+        self._prune_cooldowns(time.monotonic())
+
+    def _prune_cooldowns(self, now: float) -> None:
+        # drop expired deadlines so one-off chatters don't accumulate forever
+        self._cooldown_until = {
+            k: until for k, until in self._cooldown_until.items() if until > now
+        }
 
     async def _announce_levelup(self, message: discord.Message, new_level: int) -> None:
         """Send level-up message and apply role rewards if configured."""
@@ -196,7 +317,7 @@ class Leveling(commands.Cog, name="Leveling"):
             await lvl_ch.send(f"Player {message.author.mention} has leveled up.")
 
             # Role reward (optional)
-            role_id = config.ROLE_REWARDS.get(new_level)
+            role_id = self._role_rewards.get(new_level)
             if not role_id:
                 return
 
@@ -204,28 +325,22 @@ class Leveling(commands.Cog, name="Leveling"):
             if not role:
                 return
 
-            lines = [
-                [
-                    ("Player ", config.REGULAR_FONT_PATH),
-                    (message.author.display_name, config.BOLD_ITALIC_FONT_PATH),
-                ],
-                [("has been promoted to an ", config.REGULAR_FONT_PATH)],
-                [(f"{role.name}.", config.BOLD_ITALIC_FONT_PATH)],
-            ]
-
-            buf = image_utils.make_multiline_glow(
-                config.LEVELUP_BANNER_PATH,
-                lines,
-                max_font_size=50,
-                glow_radii=(20, 40, 80),
-                v_pad=8,
-            )
+            await message.author.add_roles(role, reason="Level up reward")
 
-            await lvl_ch.send(
-                file=discord.File(fp=buf, filename="rankup.jpg"),
-                allowed_mentions=discord.AllowedMentions(users=True),
+            job = LevelupBannerJob(
+                channel=lvl_ch,
+                display_name=message.author.display_name,
+                role_id=role.id,
+                role_name=role.name,
             )
-            await message.author.add_roles(role, reason="Level up reward")
+            if not self._levelup.submit(job):
+                log.warning(
+                    "Level-up banner queue full; sending text-only promotion in guild %s",
+                    guild_id,
+                )
+                await lvl_ch.send(
+                    f"Player **{job.display_name}** has been promoted to an **{job.role_name}**."
+                )
         except discord.Forbidden:
             log.warning(
                 "Missing permissions to announce level up in guild %s", message.guild.id
@@ -233,114 +348,186 @@ class Leveling(commands.Cog, name="Leveling"):
         except Exception:
             log.exception("Failed to announce level up for %s", message.author.id)
 
-    # pylint: disable=too-many-branches
     async def stage_awards_for_date(self, target_date: str) -> None:
-        for guild in self.bot.guilds:
-            top = await database.get_daily_top_user(guild.id, target_date)
-            if not top:
-                log.info("No daily_xp rows for guild=%s on %s", guild.id, target_date)
-                continue
-
-            user_id, xp_gain = top
-            chan_id = getattr(config, "DAILY_ANNOUNCE_CHANNEL", {}).get(guild.id)
-            await database.stage_daily_award(
-                guild.id, target_date, user_id, xp_gain, chan_id
-            )
+        # gains still buffered from target_date must reach daily_xp before it settles
+        await self.xp_buffer.flush()
+        # One transaction picks every guild's winner, stages it in the outbox and
+        # clears that day's daily_xp; Discord work happens later, off a settled DB.
+        channels = {g.id: self._daily_announce.get(g.id) for g in self.bot.guilds}
+        claimed = await database.claim_daily_awards(target_date, channels)
+
+        for guild_id in channels:
+            if guild_id not in claimed:
+                log.info("No daily_xp rows for guild=%s on %s", guild_id, target_date)
+        for guild_id, (user_id, xp_gain) in claimed.items():
             log.info(
                 "Staged award: guild=%s date=%s user=%s xp=%s",
-                guild.id,
+                guild_id,
                 target_date,
                 user_id,
                 xp_gain,
             )
 
     async def _drain_award_outbox_once(self) -> None:
+        # rows of one guild stay in order (role handover); guilds run side by side
+        by_guild: dict[int, list[dict]] = {}
         for row in await database.list_outbox_pending():
-            guild_id = int(row["guild_id"])
-            target_date = str(row["target_date"])
-            user_id = int(row["user_id"])
-            xp_gain = int(row["xp_gain"])
-            chan_id = (row.get("payload") or {}).get("channel_id")
-
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                continue
+            by_guild.setdefault(int(row["guild_id"]), []).append(row)
+
+        sem = asyncio.Semaphore(DAILY_AWARD_CONCURRENCY)
+        announced: list[dict] = []
+
+        async def run(guild_id: int, rows: list[dict]) -> None:
+            async with sem:
+                guild = self.bot.get_guild(guild_id)
+                if guild:
+                    await self._prefetch_members(
+                        guild, [int(r["user_id"]) for r in rows]
+                    )
+                for row in rows:
+                    msg_id = await self._deliver_award(row)
+                    if msg_id is not None:
+                        announced.append(
+                            {
+                                "guild_id": int(row["guild_id"]),
+                                "target_date": str(row["target_date"]),
+                                "message_id": msg_id,
+                            }
+                        )
+
+        results = await asyncio.gather(
+            *(run(gid, rows) for gid, rows in by_guild.items()),
+            return_exceptions=True,
+        )
+        for guild_id, result in zip(by_guild, results):
+            if isinstance(result, Exception):
+                log.error(
+                    "Award delivery failed for guild=%s", guild_id, exc_info=result
+                )
 
-            # Best-effort role ops
+        # one write marks every announcement of this pass
+        if announced:
             try:
-                role = guild.get_role(config.DAILY_XP_ROLE)
-                if role:
-                    for holder in list(role.members):
-                        try:
-                            await holder.remove_roles(
-                                role, reason=f"Daily XP reset {target_date}"
-                            )
-                        except Exception:
-                            log.warning(
-                                "Role remove failed for %s in %s", holder.id, guild_id
-                            )
-
-                    try:
-                        member = guild.get_member(user_id) or await guild.fetch_member(
-                            user_id
+                await database.mark_awards_announced(announced)
+                log.info("Marked %d award(s) announced", len(announced))
+            except Exception:
+                log.exception("Marking %d award(s) announced failed", len(announced))
+
+    async def _prefetch_members(
+        self, guild: discord.Guild, user_ids: list[int]
+    ) -> None:
+        """Load uncached members with one gateway query, so get_member hits later."""
+        missing = [
+            uid for uid in dict.fromkeys(user_ids) if guild.get_member(uid) is None
+        ]
+        if not missing:
+            return
+        try:
+            await guild.query_members(user_ids=missing[:100], limit=100, cache=True)
+        except Exception:
+            # _deliver_award still falls back to fetch_member per winner
+            log.warning("Member prefetch failed for guild=%s", guild.id)
+
+    async def _daily_award_targets(
+        self, guild: discord.Guild, chan_id: int | None
+    ) -> tuple[Optional[discord.Role], Optional[discord.abc.GuildChannel]]:
+        """Daily XP role and announce channel for `guild`, cached once resolved."""
+        cached = self._daily_award_ctx.get(guild.id)
+        if cached and (cached[1].id if cached[1] else None) == chan_id:
+            return cached
+
+        role = guild.get_role(config.DAILY_XP_ROLE)
+        ch = None
+        if chan_id:
+            ch = guild.get_channel(chan_id) or await self.bot.fetch_channel(chan_id)
+        if role and (ch or not chan_id):
+            self._daily_award_ctx[guild.id] = (role, ch)
+        return role, ch
+
+    # pylint: disable=too-many-branches
+    async def _deliver_award(self, row: dict) -> int | None:
+        """
+        Hand out roles and announce one staged award. Returns the announcement's
+        message id (0 when nothing was posted), or None to leave the row pending.
+        """
+        guild_id = int(row["guild_id"])
+        target_date = str(row["target_date"])
+        user_id = int(row["user_id"])
+        xp_gain = int(row["xp_gain"])
+        chan_id = (row.get("payload") or {}).get("channel_id")
+
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return None
+
+        try:
+            role, ch = await self._daily_award_targets(guild, chan_id)
+        except Exception:
+            log.exception("Resolving award role/channel failed for guild=%s", guild_id)
+            return None  # leave pending; retry next loop
+
+        # Best-effort role ops
+        try:
+            if role:
+                holders = list(role.members)
+                role_sem = asyncio.Semaphore(ROLE_EDIT_CONCURRENCY)
+
+                async def remove(holder: discord.Member) -> None:
+                    async with role_sem:
+                        await holder.remove_roles(
+                            role, reason=f"Daily XP reset {target_date}"
                         )
-                        if role not in member.roles:
-                            await member.add_roles(
-                                role, reason=f"Most XP on {target_date}: {xp_gain}"
-                            )
-                    except Exception:
+
+                results = await asyncio.gather(
+                    *(remove(h) for h in holders), return_exceptions=True
+                )
+                for holder, result in zip(holders, results):
+                    if isinstance(result, Exception):
                         log.warning(
-                            "Winner fetch/add failed for %s in %s", user_id, guild_id
+                            "Role remove failed for %s in %s", holder.id, guild_id
                         )
-            except Exception:
-                log.warning("Role ops skipped for guild=%s due to error", guild_id)
 
-            # Announce
-            msg_id = 0
-            try:
-                if chan_id:
-                    ch = guild.get_channel(chan_id) or await self.bot.fetch_channel(
-                        chan_id
+                try:
+                    member = guild.get_member(user_id) or await guild.fetch_member(
+                        user_id
                     )
-                    if isinstance(ch, discord.TextChannel):
-                        msg = await ch.send(
-                            f"🏆 Congrats <@{user_id}>: you gained the most XP today with **{xp_gain} XP**! "
-                            f"You have been awarded: **{role.mention}**"
-                        )
-                        msg_id = msg.id
-                    else:
-                        log.warning(
-                            "Configured channel %s not a TextChannel in %s",
-                            chan_id,
-                            guild_id,
+                    if role not in member.roles:
+                        await member.add_roles(
+                            role, reason=f"Most XP on {target_date}: {xp_gain}"
                         )
+                except Exception:
+                    log.warning(
+                        "Winner fetch/add failed for %s in %s", user_id, guild_id
+                    )
+        except Exception:
+            log.warning("Role ops skipped for guild=%s due to error", guild_id)
+
+        # Announce
+        msg_id = 0
+        try:
+            if chan_id:
+                if isinstance(ch, discord.TextChannel):
+                    msg = await ch.send(
+                        f"🏆 Congrats <@{user_id}>: you gained the most XP today with **{xp_gain} XP**! "
+                        f"You have been awarded: **{role.mention}**"
+                    )
+                    msg_id = msg.id
                 else:
-                    log.warning("No announce channel configured for guild=%s", guild_id)
-            except Exception:
-                log.exception(
-                    "Announcement failed for guild=%s date=%s", guild_id, target_date
-                )
-                continue  # leave pending; retry next loop
+                    log.warning(
+                        "Configured channel %s not a TextChannel in %s",
+                        chan_id,
+                        guild_id,
+                    )
+            else:
+                log.warning("No announce channel configured for guild=%s", guild_id)
+        except Exception:
+            log.exception(
+                "Announcement failed for guild=%s date=%s", guild_id, target_date
+            )
+            return None  # leave pending; retry next loop
 
-            # Mark announced and then cleanup (gated by announced_at)
-            try:
-                await database.mark_award_announced(guild_id, target_date, msg_id)
-                deleted = await database.reset_daily_xp_after_announce(
-                    guild_id, target_date
-                )
-                log.info(
-                    "Announced and reset guild=%s date=%s (deleted=%s)",
-                    guild_id,
-                    target_date,
-                    deleted,
-                )
-            except Exception:
-                log.exception(
-                    "Post-announce DB ops failed for guild=%s date=%s",
-                    guild_id,
-                    target_date,
-                )
-                # It was announced but not reset; next pass will only run reset since announced_at is set.
+        log.info("Announced award guild=%s date=%s", guild_id, target_date)
+        return msg_id
 
     @tasks.loop(time=dt_time(0, 0, tzinfo=ET))
     async def daily_award_stage_task(self):
@@ -372,8 +559,12 @@ class Leveling(commands.Cog, name="Leveling"):
         try:
             target = member or interaction.user
 
-            user_data = await database.get_user(target.id, interaction.guild.id)
-            user_rank = await database.get_user_rank(target.id, interaction.guild.id)
+            # independent reads: overlap their round-trips
+            user_data, user_rank, data = await asyncio.gather(
+                database.get_user(target.id, interaction.guild.id),
+                database.get_user_rank(target.id, interaction.guild.id),
+                database.get_user_profile(target.id, interaction.guild.id),
+            )
 
             if not user_data or user_rank is None:
                 return await interaction.followup.send(
@@ -384,9 +575,7 @@ class Leveling(commands.Cog, name="Leveling"):
             cur_level_xp = xp_for_level(level)
             next_level_xp = xp_for_level(level + 1)
 
-            data = (
-                await database.get_user_profile(target.id, interaction.guild.id) or {}
-            )
+            data = data or {}
             primary = data.get("primary_color")
             accent = data.get("accent_color")
             banner_path = data.get("banner_path")
@@ -395,21 +584,35 @@ class Leveling(commands.Cog, name="Leveling"):
                 await fetch_banner_bytes(banner_path) if banner_path else None
             )
 
-            card = RankCardData(
-                member=target,
-                level=level,
-                rank=user_rank,
-                current_xp=total_xp - cur_level_xp,
-                required_xp=next_level_xp - cur_level_xp,
-                total_xp=total_xp,
-                primary_color=primary,
-                accent_color=accent,
-                banner_bytes=banner_bytes,
+            cache_key = (
+                target.id,
+                interaction.guild.id,
+                level,
+                user_rank,
+                total_xp // RANK_CARD_XP_BUCKET,
+                hashlib.blake2b(banner_bytes or b"", digest_size=8).digest(),
+                primary,
+                accent,
             )
+            png = self._rank_cards.get(cache_key)
+            if png is None:
+                card = RankCardData(
+                    member=target,
+                    level=level,
+                    rank=user_rank,
+                    current_xp=total_xp - cur_level_xp,
+                    required_xp=next_level_xp - cur_level_xp,
+                    total_xp=total_xp,
+                    primary_color=primary,
+                    accent_color=accent,
+                    banner_bytes=banner_bytes,
+                )
+                png = await banner_helper.render_rank_card(card)
+                self._rank_cards.set(cache_key, png)
 
-            # assumes you updated the function signature to accept the dataclass
-            image_file = await banner_helper.generate_rank_card(card)
-            await interaction.followup.send(file=image_file)
+            await interaction.followup.send(
+                file=discord.File(fp=BytesIO(png), filename="rank.png")
+            )
 
         except Exception:
             log.exception("Error in /rank command")
@@ -425,13 +628,19 @@ class Leveling(commands.Cog, name="Leveling"):
     async def leaderboard(self, interaction: discord.Interaction):
         await interaction.response.defer()
         try:
-            rows = await database.get_leaderboard(interaction.guild.id, 200)
+            first = self._leaderboards.get(interaction.guild.id)
+            if first is None:
+                first = await database.get_leaderboard_page(
+                    interaction.guild.id, 0, LEADERBOARD_PAGE_SIZE
+                )
+                self._leaderboards.set(interaction.guild.id, first)
+            rows, total = first
             if not rows:
                 return await interaction.followup.send(
                     "No leaderboard data yet.", ephemeral=True
                 )
 
-            view = LeaderboardView(interaction, rows)
+            view = LeaderboardView(interaction, rows, total)
             view.update_buttons()
             embed = await view.generate_embed()
 
@@ -445,57 +654,7 @@ class Leveling(commands.Cog, name="Leveling"):
             )
 
     def _is_hex(self, s: str) -> bool:
-        return (
-            isinstance(s, str)
-            and len(s) == 7
-            and s.startswith("#")
-            and all(c in "0123456789abcdefABCDEF" for c in s[1:])
-        )
-
-    # pylint: disable=too-many-arguments
-    def _process_banner_bytes(
-        self,
-        raw: bytes,
-        prefer_webp: bool = True,
-        *,
-        target_size: Tuple[int, int] = (config.CARD_WIDTH, config.CARD_HEIGHT),
-        centering: Tuple[float, float] = (0.5, 0.5),  # 0..1
-        darken_overlay_rgba: tuple[int, int, int, int] | None = None,
-        jpeg_bg: tuple[int, int, int] = (0, 0, 0),
-    ) -> tuple[bytes, str, str]:
-        """
-        Return (processed_bytes, mime, ext) cropped to exactly `target_size` via cover scaling.
-        """
-        # 1) Open safely & normalize
-        img = image_utils.safe_open(raw).convert("RGBA")
-
-        # 2) Cover scale + crop to the banner box
-        img = ImageOps.fit(
-            img,
-            target_size,
-            method=Image.Resampling.LANCZOS,
-            centering=centering,
-        )
-
-        # 3) Optional overlay to help white text pop
-        if darken_overlay_rgba:
-            overlay = Image.new("RGBA", img.size, darken_overlay_rgba)
-            img = Image.alpha_composite(img, overlay)
-
-        # 4) Pick format & encode
-        has_alpha = img.mode == "RGBA"
-        ext, mime = image_utils.sniff_ext_and_mime(
-            img.format or "", has_alpha, prefer_webp=prefer_webp
-        )
-
-        if ext == "webp":
-            out_bytes = image_utils.encode_webp(img, lossless=has_alpha, quality=85)
-            return out_bytes, mime, ext
-
-        # JPEG path: flatten first
-        jpg_img = image_utils.flatten_rgba_to_rgb(img, bg=jpeg_bg)
-        out_bytes = image_utils.encode_jpeg(jpg_img, quality=85)
-        return out_bytes, mime, ext
+        return isinstance(s, str) and _HEX_COLOR(s) is not None
 
     @app_commands.command(
         name="rank-set-banner",
@@ -518,16 +677,38 @@ class Leveling(commands.Cog, name="Leveling"):
                     "File too large. Please keep it under 2 MB.", ephemeral=True
                 )
 
+            # Discord reports image dimensions; refuse pixel bombs before downloading
+            if (image.width or 0) * (image.height or 0) > config.MAX_PIXELS:
+                return await interaction.followup.send(
+                    "Image dimensions are too large.", ephemeral=True
+                )
+
+            # Sniff the magic bytes before pulling the whole upload
+            head = await fetch_head_bytes(image.url)
+            if head is not None and image_utils.sniff_image_mime(head) is None:
+                return await interaction.followup.send(
+                    "That file is not a valid PNG, JPEG, or WebP image.",
+                    ephemeral=True,
+                )
+
             raw = await image.read()
+            if image_utils.sniff_image_mime(raw[:16]) is None:
+                return await interaction.followup.send(
+                    "That file is not a valid PNG, JPEG, or WebP image.",
+                    ephemeral=True,
+                )
 
-            processed, mime, ext = await asyncio.to_thread(
-                self._process_banner_bytes,
-                raw,
-                True,  # prefer_webp
-                target_size=(config.CARD_WIDTH, config.CARD_HEIGHT),
-                centering=(0.5, 0.5),
-                darken_overlay_rgba=(0, 0, 0, 96),
-                jpeg_bg=(0, 0, 0),
+            processed, mime, ext = await asyncio.get_running_loop().run_in_executor(
+                self._banner_pool,
+                partial(
+                    image_utils.process_banner_bytes,
+                    raw,
+                    True,  # prefer_webp
+                    target_size=(config.CARD_WIDTH, config.CARD_HEIGHT),
+                    centering=(0.5, 0.5),
+                    darken_overlay_rgba=(0, 0, 0, 96),
+                    jpeg_bg=(0, 0, 0),
+                ),
             )
             await database.set_rank_banner(
                 interaction.user.id, interaction.guild.id, processed, mime, ext
@@ -624,7 +805,9 @@ class Leveling(commands.Cog, name="Leveling"):
     def _parse_date_or_yesterday_et(s: str | None) -> str:
         if s:
             try:
-                datetime.strptime(s, "%Y-%m-%d")  # strict check
+                if not _ISO_DATE(s):
+                    raise ValueError(s)
+                date(int(s[:4]), int(s[5:7]), int(s[8:10]))  # real calendar day
                 return s
             except ValueError as exc:
                 raise ValueError("Date must be in YYYY-MM-DD format.") from exc
@@ -660,7 +843,7 @@ class Leveling(commands.Cog, name="Leveling"):
 
         reward_roles = {}
         invalid_role_ids = []
-        for level, role_id in config.ROLE_REWARDS.items():
+        for level, role_id in self._role_rewards.items():
             role = guild.get_role(role_id)
             if role:
                 reward_roles[level] = role
@@ -1,20 +1,32 @@
 # cogs/scheduling.py
 
-from datetime import datetime
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
-from typing import Optional
+from typing import Awaitable, Optional
 
 #
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 
 #
 import config
 
 from helpers.logging_helper import get_logger, add_throttle
+from utility.cache_utils import TTLCache
+from utility.schedule_utils import PingSchedule, next_weekly_fire
 
 EASTERN_TIMEZONE = ZoneInfo("America/New_York")
+# Discord refuses to bulk-delete messages older than this
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=1)
+# seconds between scheduled purges of the same channel
+PURGE_MIN_INTERVAL = 2.5
+# seconds a rendered /testschedule checkup is reused
+CHECKUP_TTL = 30.0
 
 logger = get_logger("scheduler")
 heartbeat = get_logger("scheduler.heartbeat")
@@ -24,23 +36,86 @@ add_throttle(heartbeat, 900)
 class Scheduling(commands.Cog, name="Scheduling"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.ping_roles.start()
+        # minute-of-week (Mon 00:00 = 0) -> everything due in that minute
+        self._by_mow: dict[int, list[tuple[str, PingSchedule]]] = {}
+        # min-heap of (fire_at_epoch, minute_of_week), one entry per occupied slot
+        self._events: list[tuple[float, int]] = []
+        self._runner_task: Optional[asyncio.Task] = None
+        self._excluded_channels: frozenset[int] = frozenset()
+        # guild_id -> rendered checkup embed; schedules are static, roles/channels not
+        self._checkup_embeds: TTLCache[discord.Embed] = TTLCache(
+            maxsize=16, ttl=CHECKUP_TTL
+        )
+        # per-channel purge serialisation and spacing
+        self._purge_locks: dict[int, asyncio.Lock] = {}
+        self._purge_last: dict[int, float] = {}
+
+    async def cog_load(self):
+        self._excluded_channels = frozenset(
+            getattr(config, "EXCLUDED_CHANNELS", None) or ()
+        )
+        self._build_events(datetime.now(EASTERN_TIMEZONE))
+        self._runner_task = asyncio.create_task(self._runner())
 
     async def cog_unload(self):
         try:
-            if self.ping_roles.is_running():
-                self.ping_roles.cancel()
+            if self._runner_task and not self._runner_task.done():
+                self._runner_task.cancel()
         except Exception:
-            logger.exception("Failed to unload ping_roles loop")
+            logger.exception("Failed to unload scheduler runner")
 
-    @tasks.loop(minutes=1)
-    async def ping_roles(self):
-        now = datetime.now(EASTERN_TIMEZONE)
-        weekday = now.weekday()
+    def _build_events(self, now: datetime) -> None:
+        """Index every ping/purge by minute-of-week and queue each slot's next fire."""
+        by_mow: dict[int, list[tuple[str, PingSchedule]]] = {}
+        for sched in config.PING_SCHEDULES:
+            for day in sched.days:
+                mow = day * 1440 + sched.ping_hour * 60 + sched.ping_min
+                by_mow.setdefault(mow, []).append(("ping", sched))
+                if sched.delete_hour is not None:
+                    mow = day * 1440 + sched.delete_hour * 60 + sched.delete_min
+                    by_mow.setdefault(mow, []).append(("purge", sched))
+        self._by_mow = by_mow
+        self._events = [(self._next_fire(now, mow), mow) for mow in by_mow]
+        heapq.heapify(self._events)
 
-        heartbeat.debug(
-            "Loop tick ET=%s weekday=%s", now.strftime("%Y-%m-%d %H:%M:%S %Z"), weekday
+    @staticmethod
+    def _next_fire(now: datetime, mow: int) -> float:
+        day, minute_of_day = divmod(mow, 1440)
+        hour, minute = divmod(minute_of_day, 60)
+        return next_weekly_fire(now, day, hour, minute).timestamp()
+
+    async def _runner(self):
+        await self.bot.wait_until_ready()
+        logger.info(
+            "Scheduler task ready (timezone=%s, slots=%s)",
+            EASTERN_TIMEZONE,
+            len(self._events),
         )
+        # sleep a hair past the target so we never wake just before it
+        resolution = time.get_clock_info("time").resolution
+        while self._events:
+            fire_at = self._events[0][0]
+            await asyncio.sleep(max(0.0, fire_at - time.time()) + resolution)
+            try:
+                await self._fire_due()
+            except Exception:
+                logger.exception("Scheduler dispatch failed")
+        logger.info("No scheduled events configured; scheduler idle")
+
+    async def _fire_due(self) -> None:
+        """Dispatch every slot that is due and queue its next weekly occurrence."""
+        now = datetime.now(EASTERN_TIMEZONE)
+        if heartbeat.isEnabledFor(logging.DEBUG):
+            heartbeat.debug(
+                "Scheduler wake ET=%s", now.strftime("%Y-%m-%d %H:%M:%S %Z")
+            )
+
+        due: list[tuple[str, PingSchedule]] = []
+        now_ts = now.timestamp()
+        while self._events and self._events[0][0] <= now_ts:
+            _, mow = self._events[0]
+            heapq.heapreplace(self._events, (self._next_fire(now, mow), mow))
+            due.extend(self._by_mow[mow])
 
         if not getattr(config, "GUILD_ID", None):
             logger.debug("No GUILD_ID configured; skipping tick")
@@ -51,69 +126,111 @@ class Scheduling(commands.Cog, name="Scheduling"):
             logger.warning("Could not find guild with ID %s", config.GUILD_ID)
             return
 
-        for sched in config.PING_SCHEDULES:
-            logger.debug(
-                "Checking schedule role_id=%s channel_id=%s", sched.role_id, sched.ch_id
-            )
+        # resolve each id once for the whole batch
+        channels = {s.ch_id: guild.get_channel(s.ch_id) for _, s in due}
+        roles = {s.role_id: guild.get_role(s.role_id) for a, s in due if a == "ping"}
 
-            if weekday not in sched.days:
-                logger.debug("Skip: weekday %s not in %s", weekday, sched.days)
-                continue
-
-            channel = guild.get_channel(sched.ch_id)
+        # only messages young enough for bulk delete; older ones would fall back
+        # to one DELETE request each
+        cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+        calls: list[Awaitable] = []
+        labels: list[tuple[str, PingSchedule, discord.abc.GuildChannel]] = []
+        for action, sched in due:
+            channel = channels[sched.ch_id]
             if not channel:
                 logger.warning("Skip: channel_id %s not found", sched.ch_id)
                 continue
 
             # Send ping
-            if now.hour == sched.ping_hour and now.minute == sched.ping_min:
-                role = guild.get_role(sched.role_id)
-                if role:
-                    try:
-                        await channel.send(f"{role.mention} {sched.msg}")
-                        logger.info(
-                            "Ping sent: channel=%s role_id=%s msg=%s",
-                            channel.name,
-                            role.id,
-                            sched.msg,
-                        )
-                    except discord.errors.Forbidden:
-                        logger.error(
-                            "Missing permissions to send ping in #%s", channel.name
-                        )
-                    except Exception:
-                        logger.exception("Failed to send ping in #%s", channel.name)
-                else:
+            if action == "ping":
+                role = roles[sched.role_id]
+                if not role:
                     logger.error(
                         "Role not found for scheduled ping: role_id=%s", sched.role_id
                     )
+                    continue
+                calls.append(channel.send(sched.ping_text))
 
             # Purge channel
-            if (
-                sched.delete_hour is not None
-                and now.hour == sched.delete_hour
-                and now.minute == sched.delete_min
-            ):
-                if (
-                    getattr(config, "EXCLUDED_CHANNELS", None)
-                    and channel.id in config.EXCLUDED_CHANNELS
-                ):
-                    logger.debug("Skip purge: channel_id %s is excluded", channel.id)
-                else:
-                    try:
-                        await channel.purge(limit=1000)
-                        logger.info("Purged messages in #%s (limit=1000)", channel.name)
-                    except discord.errors.Forbidden:
-                        logger.error(
-                            "Missing permissions to purge in #%s", channel.name
-                        )
-                    except Exception:
-                        logger.exception("Failed to purge in #%s", channel.name)
-
-    @ping_roles.before_loop
-    async def before_ping_roles(self):
-        await self.bot.wait_until_ready()
-        logger.info("Scheduler task ready (timezone=%s)", EASTERN_TIMEZONE)
+            elif channel.id in self._excluded_channels:
+                logger.debug("Skip purge: channel_id %s is excluded", channel.id)
+                continue
+            else:
+                calls.append(self._purge(channel, cutoff))
+            labels.append((action, sched, channel))
+
+        # different channels sit on different rate-limit buckets, so send together
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for (action, sched, channel), result in zip(labels, results):
+            verb = "send ping" if action == "ping" else "purge"
+            if isinstance(result, discord.errors.Forbidden):
+                logger.error("Missing permissions to %s in #%s", verb, channel.name)
+            elif isinstance(result, BaseException):
+                logger.error(
+                    "Failed to %s in #%s",
+                    verb,
+                    channel.name,
+                    exc_info=(type(result), result, result.__traceback__),
+                )
+            elif action == "ping":
+                logger.info(
+                    "Ping sent: channel=%s role_id=%s msg=%s",
+                    channel.name,
+                    sched.role_id,
+                    sched.msg,
+                )
+            else:
+                logger.info(
+                    "Purged %s messages in #%s (limit=1000)", len(result), channel.name
+                )
+
+    async def _purge(self, channel: discord.TextChannel, cutoff: datetime) -> list:
+        """Purge `channel`, one bulk delete at a time and spaced per channel."""
+        loop = asyncio.get_running_loop()
+        async with self._purge_locks.setdefault(channel.id, asyncio.Lock()):
+            since = loop.time() - self._purge_last.get(channel.id, float("-inf"))
+            if since < PURGE_MIN_INTERVAL:
+                await asyncio.sleep(PURGE_MIN_INTERVAL - since)
+            try:
+                return await channel.purge(
+                    limit=1000, after=cutoff, bulk=True, reason="scheduled purge"
+                )
+            finally:
+                self._purge_last[channel.id] = loop.time()
+
+    def _build_checkup_embed(self, guild: discord.Guild) -> discord.Embed:
+        schedules = config.PING_SCHEDULES
+        embed = discord.Embed(
+            title="Scheduler Status Check",
+            description="Checking all configured schedules...",
+            color=discord.Color.blue(),
+        )
+        channels = {s.ch_id: guild.get_channel(s.ch_id) for s in schedules}
+        roles = {s.role_id: guild.get_role(s.role_id) for s in schedules}
+        for i, sched in enumerate(schedules):
+            # sched: PingSchedule
+            role = roles[sched.role_id]
+            channel = channels[sched.ch_id]
+
+            status = ""
+            status += (
+                f"✅ Channel: {channel.mention}"
+                if channel
+                else f"❌ Channel ID `{sched.ch_id}` not found."
+            )
+            status += "\n"
+            status += (
+                f"✅ Role: `{role.name}`"
+                if role
+                else f"❌ Role ID `{sched.role_id}` not found."
+            )
+
+            embed.add_field(
+                name=f"Schedule #{i}: `{sched.msg[:50]}`...",
+                value=status,
+                inline=False,
+            )
+        return embed
 
     @app_commands.command(
         name="testschedule", description="Tests the scheduling configuration."
@@ -135,34 +252,10 @@ class Scheduling(commands.Cog, name="Scheduling"):
 
         # === CHECKUP MODE ===
         if index is None:
-            embed = discord.Embed(
-                title="Scheduler Status Check",
-                description="Checking all configured schedules...",
-                color=discord.Color.blue(),
-            )
-            for i, sched in enumerate(config.PING_SCHEDULES):
-                # sched: PingSchedule
-                role = guild.get_role(sched.role_id)
-                channel = guild.get_channel(sched.ch_id)
-
-                status = ""
-                status += (
-                    f"✅ Channel: {channel.mention}"
-                    if channel
-                    else f"❌ Channel ID `{sched.ch_id}` not found."
-                )
-                status += "\n"
-                status += (
-                    f"✅ Role: `{role.name}`"
-                    if role
-                    else f"❌ Role ID `{sched.role_id}` not found."
-                )
-
-                embed.add_field(
-                    name=f"Schedule #{i}: `{sched.msg[:50]}`...",
-                    value=status,
-                    inline=False,
-                )
+            embed = self._checkup_embeds.get(guild.id)
+            if embed is None:
+                embed = self._build_checkup_embed(guild)
+                self._checkup_embeds.set(guild.id, embed)
 
             # Using interaction.response
             await interaction.response.send_message(embed=embed, ephemeral=True)
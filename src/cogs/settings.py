@@ -1,3 +1,4 @@
+from bisect import bisect_right
 from typing import Optional
 
 #
@@ -14,6 +15,24 @@ from views.purge_confirmation_view import PurgeConfirmationView
 
 logger = get_logger("settings")
 
+# (source dict, sorted thresholds, sorted (threshold, role_id) pairs); rebuilt only
+# when config.ROLE_REWARDS is swapped for a different dict
+_reward_index: tuple[dict, list[int], list[tuple[int, int]]] = ({}, [], [])
+
+
+def _rewards_between(low: int, high: int) -> list[tuple[int, int]]:
+    """(threshold, role_id) reward pairs with low < threshold <= high."""
+    if low >= high:
+        # no level boundary crossed (the usual small adjustment)
+        return []
+    global _reward_index  # pylint: disable=global-statement
+    rewards = config.ROLE_REWARDS
+    if _reward_index[0] is not rewards:
+        pairs = sorted(rewards.items())
+        _reward_index = (rewards, [t for t, _ in pairs], pairs)
+    _, thresholds, pairs = _reward_index
+    return pairs[bisect_right(thresholds, low) : bisect_right(thresholds, high)]
+
 
 class SettingsCog(commands.Cog, name="Settings"):
     def __init__(self, bot: commands.Bot):
@@ -129,14 +148,14 @@ class SettingsCog(commands.Cog, name="Settings"):
     @app_commands.describe(seconds="The cooldown time in seconds.")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def set_cooldown(self, interaction: discord.Interaction, seconds: int):
+        if seconds < 0:
+            await interaction.response.send_message(
+                "Cooldown cannot be negative.", ephemeral=True
+            )
+            return
+
         await interaction.response.defer(ephemeral=True)
         try:
-            if seconds < 0:
-                await interaction.followup.send(
-                    "Cooldown cannot be negative.", ephemeral=True
-                )
-                return
-
             guild_id = interaction.guild.id
             await database.set_xp_cooldown(guild_id, seconds)
             leveling_cog = self.bot.get_cog("Leveling")
@@ -166,15 +185,15 @@ class SettingsCog(commands.Cog, name="Settings"):
     async def set_xprange(
         self, interaction: discord.Interaction, min_xp: int, max_xp: int
     ):
+        if min_xp < 0 or max_xp <= min_xp:
+            await interaction.response.send_message(
+                "Invalid XP range. Ensure min < max and both are non-negative.",
+                ephemeral=True,
+            )
+            return
+
         await interaction.response.defer(ephemeral=True)
         try:
-            if min_xp < 0 or max_xp <= min_xp:
-                await interaction.followup.send(
-                    "Invalid XP range. Ensure min < max and both are non-negative.",
-                    ephemeral=True,
-                )
-                return
-
             guild_id = interaction.guild.id
             await database.update_xp_range(guild_id, min_xp, max_xp)
             leveling_cog = self.bot.get_cog("Leveling")
@@ -207,8 +226,13 @@ class SettingsCog(commands.Cog, name="Settings"):
     ):
         await interaction.response.defer(ephemeral=True)
         try:
-            user_data = await database.get_user(member.id, interaction.guild.id)
-            old_total_xp, old_level = user_data if user_data else (0, 0)
+            leveling_cog = self.bot.get_cog("Leveling")
+            if leveling_cog:
+                await leveling_cog.xp_buffer.flush()
+
+            old_total_xp, old_level, _, _ = await database.adjust_user_xp(
+                member.id, interaction.guild.id, 0, reset=True
+            )
 
             if old_total_xp == 0:
                 await interaction.followup.send(
@@ -216,18 +240,24 @@ class SettingsCog(commands.Cog, name="Settings"):
                 )
                 return
 
-            await database.set_user_xp_and_level(member.id, interaction.guild.id, 0, 0)
+            if leveling_cog:
+                leveling_cog.xp_buffer.forget((interaction.guild.id, member.id))
             new_status = build_xp_status(0)
 
-            removed = []
-            for threshold, role_id in config.ROLE_REWARDS.items():
-                if old_level >= threshold > new_status.level:
-                    role = interaction.guild.get_role(role_id)
-                    if role and role in member.roles:
-                        await member.remove_roles(
-                            role, reason="XP dropped below threshold"
-                        )
-                        removed.append(role.name)
+            to_remove: list[discord.Role] = []
+            member_role_ids = {r.id for r in member.roles}
+            for _, role_id in _rewards_between(new_status.level, old_level):
+                if role_id not in member_role_ids:
+                    continue
+                role = interaction.guild.get_role(role_id)
+                if role:
+                    to_remove.append(role)
+            if to_remove:
+                # atomic=False folds every role into one member edit
+                await member.remove_roles(
+                    *to_remove, reason="XP dropped below threshold", atomic=False
+                )
+            removed = [role.name for role in to_remove]
 
             msg = (
                 f"❌ Removed **{old_total_xp} XP** from {member.mention}.\n"
@@ -265,28 +295,33 @@ class SettingsCog(commands.Cog, name="Settings"):
     ):
         await interaction.response.defer(ephemeral=True)
         try:
-            user_data = await database.get_user(member.id, interaction.guild.id)
-            current_xp = user_data[0] if user_data else 0
-            old_level = level_from_xp(current_xp)
+            leveling_cog = self.bot.get_cog("Leveling")
+            if leveling_cog:
+                await leveling_cog.xp_buffer.flush()
 
-            new_total_xp = current_xp + amount
-            new_status = build_xp_status(new_total_xp)
-            await database.set_user_xp_and_level(
-                member.id, interaction.guild.id, new_total_xp, new_status.level
+            current_xp, _, new_total_xp, new_level = await database.adjust_user_xp(
+                member.id, interaction.guild.id, amount
             )
-
-            awarded = []
-            for threshold, role_id in config.ROLE_REWARDS.items():
-                if old_level < threshold <= new_status.level:
-                    role = interaction.guild.get_role(role_id)
-                    if role:
-                        await member.add_roles(role, reason="Reached level threshold")
-                        awarded.append(role.name)
+            old_level = level_from_xp(current_xp)
+            if leveling_cog:
+                leveling_cog.xp_buffer.forget((interaction.guild.id, member.id))
+
+            to_add: list[discord.Role] = []
+            for _, role_id in _rewards_between(old_level, new_level):
+                role = interaction.guild.get_role(role_id)
+                if role:
+                    to_add.append(role)
+            if to_add:
+                # atomic=False folds every role into one member edit
+                await member.add_roles(
+                    *to_add, reason="Reached level threshold", atomic=False
+                )
+            awarded = [role.name for role in to_add]
 
             msg = (
                 f"✅ Added **{amount} XP** to {member.mention}.\n"
-                f"• Level: **{old_level} → {new_status.level}**\n"
-                f"• Total XP: **{new_status.total_xp}**\n"
+                f"• Level: **{old_level} → {new_level}**\n"
+                f"• Total XP: **{new_total_xp}**\n"
             )
             if awarded:
                 msg += "🎉 Roles awarded: " + ", ".join(awarded)
@@ -298,8 +333,8 @@ class SettingsCog(commands.Cog, name="Settings"):
                 member.id,
                 amount,
                 old_level,
-                new_status.level,
-                new_status.total_xp,
+                new_level,
+                new_total_xp,
                 ",".join(awarded) if awarded else "-",
             )
         except Exception:
@@ -321,30 +356,36 @@ class SettingsCog(commands.Cog, name="Settings"):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            user_data = await database.get_user(member.id, interaction.guild.id)
-            current_xp = user_data[0] if user_data else 0
-            old_level = level_from_xp(current_xp)
+            leveling_cog = self.bot.get_cog("Leveling")
+            if leveling_cog:
+                await leveling_cog.xp_buffer.flush()
 
-            new_total_xp = max(0, current_xp - amount)
-            new_status = build_xp_status(new_total_xp)
-            await database.set_user_xp_and_level(
-                member.id, interaction.guild.id, new_total_xp, new_status.level
+            current_xp, _, new_total_xp, new_level = await database.adjust_user_xp(
+                member.id, interaction.guild.id, -amount
             )
-
-            removed = []
-            for threshold, role_id in config.ROLE_REWARDS.items():
-                if old_level >= threshold > new_status.level:
-                    role = interaction.guild.get_role(role_id)
-                    if role and role in member.roles:
-                        await member.remove_roles(
-                            role, reason="XP dropped below threshold"
-                        )
-                        removed.append(role.name)
+            old_level = level_from_xp(current_xp)
+            if leveling_cog:
+                leveling_cog.xp_buffer.forget((interaction.guild.id, member.id))
+
+            to_remove: list[discord.Role] = []
+            member_role_ids = {r.id for r in member.roles}
+            for _, role_id in _rewards_between(new_level, old_level):
+                if role_id not in member_role_ids:
+                    continue
+                role = interaction.guild.get_role(role_id)
+                if role:
+                    to_remove.append(role)
+            if to_remove:
+                # atomic=False folds every role into one member edit
+                await member.remove_roles(
+                    *to_remove, reason="XP dropped below threshold", atomic=False
+                )
+            removed = [role.name for role in to_remove]
 
             msg = (
                 f"❌ Removed **{amount} XP** from {member.mention}.\n"
-                f"• Level: **{old_level} → {new_status.level}**\n"
-                f"• Total XP: **{new_status.total_xp}**\n"
+                f"• Level: **{old_level} → {new_level}**\n"
+                f"• Total XP: **{new_total_xp}**\n"
             )
             if removed:
                 msg += "⚠️ Roles removed: " + ", ".join(removed)
@@ -357,8 +398,8 @@ class SettingsCog(commands.Cog, name="Settings"):
                 member.id,
                 amount,
                 old_level,
-                new_status.level,
-                new_status.total_xp,
+                new_level,
+                new_total_xp,
                 ",".join(removed) if removed else "-",
             )
 
@@ -1,11 +1,41 @@
 # src/cogs/sync.py
 
+import hashlib
+import json
+from pathlib import Path
+
 from discord.ext import commands
 
+from helpers.logging_helper import get_logger
+
+logger = get_logger("sync")
+
+# hash of the last globally synced command tree; unchanged trees skip the REST call
+SYNC_HASH_PATH = Path(__file__).resolve().parent.parent / "data" / ".sync_hash"
+
 
 class Syncer(commands.Cog, name="Syncer"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._last_hash: str | None = None
+
+    async def cog_load(self):
+        try:
+            self._last_hash = SYNC_HASH_PATH.read_text(encoding="utf-8").strip()
+        except OSError:
+            self._last_hash = None
+
+    def _tree_hash(self) -> str:
+        payload = [cmd.to_dict() for cmd in self.bot.tree.get_commands()]
+        blob = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    def _store_hash(self, tree_hash: str) -> None:
+        self._last_hash = tree_hash
+        try:
+            SYNC_HASH_PATH.write_text(tree_hash, encoding="utf-8")
+        except OSError:
+            logger.warning("Could not persist sync hash to %s", SYNC_HASH_PATH)
 
     @commands.command()
     @commands.guild_only()
@@ -15,7 +45,8 @@ class Syncer(commands.Cog, name="Syncer"):
         An owner-only command to sync application commands.
 
         Usage:
-        !sync -> Syncs global commands.
+        !sync -> Syncs global commands (skipped when nothing changed).
+        !sync force -> Syncs global commands even if nothing changed.
         !sync ~ -> Syncs commands to the current guild.
         !sync ^ -> Clears all commands from the current guild and syncs.
         """
@@ -31,7 +62,13 @@ class Syncer(commands.Cog, name="Syncer"):
             await ctx.send("Cleared all commands from this guild and re-synced.")
             return
 
+        tree_hash = self._tree_hash()
+        if spec != "force" and tree_hash == self._last_hash:
+            await ctx.send("No command changes since the last global sync; skipping.")
+            return
+
         synced = await self.bot.tree.sync()
+        self._store_hash(tree_hash)
         await ctx.send(f"Synced {len(synced)} commands globally.")
 
 
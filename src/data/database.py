@@ -3,23 +3,22 @@ import time
 from typing import Callable, TypeVar
 import random
 import asyncio
-from datetime import datetime, timezone
+from operator import itemgetter
 import logging
 import os
 import tempfile
 import httpx
 import httpcore
-import discord
-from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 
 from helpers.logging_helper import get_logger
+from utility.env_utils import load_env
 
 
 #
 # --- Initialization ---
 #
-load_dotenv()
+load_env()
 logger = get_logger("database")
 #
 url: str = os.getenv("SUPABASE_URL")
@@ -31,9 +30,33 @@ T = TypeVar("T")
 if not url or not key:
     raise ValueError("Supabase URL and Key must be set in the .env file.")
 #
-supabase: Client = create_client(url, key)
+DB_CONCURRENCY = 8  # DB calls in flight at once (worker threads)
 
-_DB_SEM = asyncio.Semaphore(8)
+
+def _client_options() -> ClientOptions | None:
+    """
+    One pooled HTTP/2 client for every Supabase call: concurrent queries
+    multiplex over a warm TLS connection instead of each paying a handshake.
+    """
+    http = httpx.Client(
+        http2=True,
+        timeout=httpx.Timeout(30.0),
+        limits=httpx.Limits(
+            max_connections=DB_CONCURRENCY * 2,
+            max_keepalive_connections=DB_CONCURRENCY,
+        ),
+    )
+    try:
+        return ClientOptions(httpx_client=http)
+    except TypeError:
+        # supabase-py without httpx client injection: keep its default transport
+        http.close()
+        return None
+
+
+supabase: Client = create_client(url, key, options=_client_options())
+
+_DB_SEM = asyncio.Semaphore(DB_CONCURRENCY)
 
 _TRANSIENT = (
     httpx.ReadError,
@@ -183,54 +206,36 @@ async def authenticate_bot() -> bool:
 #
 # --- Daily XP Functions ---
 #
-async def increment_daily_xp(user_id: int, guild_id: int, delta: int) -> None:
-    def _exec():
-        return supabase.rpc(
-            "increment_daily_xp_for_user",
-            {"p_guild_id": guild_id, "p_user_id": user_id, "p_delta": delta},
-        ).execute()
-
-    await _db_authed_async(_exec)
+async def claim_daily_awards(
+    date: str, channels: dict[int, int | None]
+) -> dict[int, tuple[int, int]]:
+    """
+    Atomically settle the ET calendar `date` for the guilds in `channels`
+    ({guild_id: announce channel id}). In one transaction the RPC picks each
+    guild's top user, stages it in daily_award_outbox (UPSERT, channel in the
+    payload) and deletes that date's daily_xp rows for those guilds. See
+    sql/rpc/claim_daily_awards.sql.
 
+    Returns {guild_id: (user_id, xp_gain)} for the guilds that had a winner.
+    """
+    if not channels:
+        return {}
 
-#
-async def get_daily_top_user(guild_id: int, date: str) -> tuple[int, int] | None:
-    """Return (user_id, xp_gain) for the ET calendar `date` in this guild, or None."""
+    guilds = [
+        {"guild_id": gid, "channel_id": chan_id} for gid, chan_id in channels.items()
+    ]
 
     def _exec():
         return supabase.rpc(
-            "get_daily_top_user", {"p_guild_id": guild_id, "p_date": date}
+            "claim_daily_awards", {"p_date": date, "p_guilds": guilds}
         ).execute()
 
     resp = await _db_authed_async(_exec)
 
-    if resp.data:
-        r = resp.data
-        return int(r["user_id"]), int(r["xp_gain"])
-
-    return None
-
-
-# ---------- Outbox: stage a winner (UPSERT) ----------
-async def stage_daily_award(
-    guild_id: int, target_date: str, user_id: int, xp_gain: int, channel_id: int | None
-) -> dict:
-    payload = {"channel_id": channel_id}
-
-    def _exec():
-        return supabase.rpc(
-            "stage_daily_award",
-            {
-                "p_guild_id": guild_id,
-                "p_target_date": target_date,  # 'YYYY-MM-DD'
-                "p_user_id": user_id,
-                "p_xp_gain": xp_gain,
-                "p_payload": payload,
-            },
-        ).execute()
-
-    resp = await _db_authed_async(_exec)
-    return resp.data or {}
+    return {
+        int(r["guild_id"]): (int(r["user_id"]), int(r["xp_gain"]))
+        for r in resp.data or []
+    }
 
 
 # ---------- Outbox: list pending (announced_at IS NULL) ----------
@@ -251,21 +256,19 @@ async def list_outbox_pending(limit: int = 50) -> list[dict]:
 
 
 # ---------- Outbox: mark announced (stores message_id, sets announced_at) ----------
-async def mark_award_announced(
-    guild_id: int, target_date: str, message_id: int
-) -> dict:
+async def mark_awards_announced(rows: list[dict]) -> None:
+    """
+    Mark a whole drain pass of outbox rows announced in one round-trip.
+    Each row is {"guild_id", "target_date", "message_id"}. See
+    sql/rpc/mark_awards_announced.sql.
+    """
+    if not rows:
+        return
+
     def _exec():
-        return supabase.rpc(
-            "mark_award_announced",
-            {
-                "p_guild_id": guild_id,
-                "p_target_date": target_date,
-                "p_message_id": message_id,
-            },
-        ).execute()
+        return supabase.rpc("mark_awards_announced", {"p_rows": rows}).execute()
 
-    resp = await _db_authed_async(_exec)
-    return resp.data or {}
+    await _db_authed_async(_exec)
 
 
 #
@@ -281,25 +284,6 @@ async def reset_daily_xp(date_str: str) -> int:
     return deleted
 
 
-async def reset_daily_xp_for_guild(guild_id: int, date_str: str) -> int:
-    """Deletes all rows for a specific guild and ET date `date_str`."""
-
-    def _exec():
-        # The RPC function now takes two parameters
-        params = {"p_guild_id": guild_id, "p_date": date_str}
-        return supabase.rpc("admin_reset_daily_xp_for_guild", params).execute()
-
-    resp = await _db_authed_async(_exec)
-    deleted = int(resp.data or 0)
-    logger.info(
-        "reset_daily_xp_for_guild(guild=%s, date=%s) deleted=%s",
-        guild_id,
-        date_str,
-        deleted,
-    )
-    return deleted
-
-
 # ---------- Cleanup: ONLY if announced_at is set ----------
 async def reset_daily_xp_after_announce(guild_id: int, target_date: str) -> int:
     def _exec():
@@ -343,16 +327,18 @@ async def set_xp_cooldown(guild_id: int, seconds: int):
 
 
 #
-async def get_all_cooldowns() -> dict[int, int]:
+async def get_all_cooldowns(all_settings: dict | None = None) -> dict[int, int]:
     """
     Loads all custom guild cooldowns by processing the main settings dump.
+    Pass an already-fetched dump to skip the round-trip.
     """
-    all_settings = await get_all_guild_settings()
-    cooldowns: dict[int, int] = {}
-    for guild_id, settings in all_settings.items():
-        if settings.get("xp_cooldown") is not None:
-            cooldowns[guild_id] = settings["xp_cooldown"]
-    return cooldowns
+    if all_settings is None:
+        all_settings = await get_all_guild_settings()
+    return {
+        guild_id: cooldown
+        for guild_id, settings in all_settings.items()
+        if (cooldown := settings.get("xp_cooldown")) is not None
+    }
 
 
 #
@@ -367,24 +353,69 @@ async def get_user(user_id: int, guild_id: int):
             .select("xp", "level")
             .eq("user_id", user_id)
             .eq("guild_id", guild_id)
+            .limit(1)
+            .maybe_single()
             .execute()
         )
 
+    # maybe_single() hands back one object, or no response at all for a miss
     response = await _db_authed_async(_exec)
-    if response.data:
-        user_data = response.data[0]
-        return user_data["xp"], user_data["level"]
+    if response is not None and response.data:
+        return response.data["xp"], response.data["level"]
     return None
 
 
 #
-async def set_user_xp_and_level(user_id: int, guild_id: int, xp: int, level: int):
-    """Creates or updates a user's record with new XP and level using upsert."""
+async def adjust_user_xp(
+    user_id: int, guild_id: int, delta: int, *, reset: bool = False
+) -> tuple[int, int, int, int]:
+    """
+    Read-modify-write a user's XP and level in one round-trip.
+
+    The RPC sets `xp = greatest(0, xp + delta)` (or 0 when `reset`) and the
+    matching level under a row lock, and returns (old_xp, old_level, new_xp,
+    new_level); a missing row reads as 0 XP. See sql/rpc/adjust_user_xp.sql.
+    """
 
     def _exec():
-        supabase.table("users").upsert(
-            {"user_id": user_id, "guild_id": guild_id, "xp": xp, "level": level},
-            on_conflict="user_id,guild_id",
+        return supabase.rpc(
+            "adjust_user_xp",
+            {
+                "p_user_id": user_id,
+                "p_guild_id": guild_id,
+                "p_delta": delta,
+                "p_reset": reset,
+            },
+        ).execute()
+
+    resp = await _db_authed_async(_exec)
+    row = (resp.data or [{}])[0]
+    return (
+        int(row.get("old_xp") or 0),
+        int(row.get("old_level") or 0),
+        int(row.get("new_xp") or 0),
+        int(row.get("new_level") or 0),
+    )
+
+
+#
+async def bulk_add_xp(rows: list[dict], *, batch_id: str) -> None:
+    """
+    Apply a batch of buffered XP gains in one round-trip.
+
+    Each row is {"guild_id", "user_id", "delta", "day"}. The RPC upserts
+    users with `xp = xp + delta` and the level that XP maps to, and adds
+    `delta` to the daily_xp row for `day` (the ET date the XP was earned), so
+    the arithmetic stays server-side.
+    `batch_id` (a UUID) is recorded with the batch; a resend of a batch that
+    already committed is a no-op. See sql/rpc/bulk_add_xp.sql.
+    """
+    if not rows:
+        return
+
+    def _exec():
+        return supabase.rpc(
+            "bulk_add_xp", {"p_rows": rows, "p_batch_id": batch_id}
         ).execute()
 
     await _db_authed_async(_exec)
@@ -413,13 +444,16 @@ async def get_user_rank(user_id: int, guild_id: int) -> int | None:
     return None
 
 
+PROFILE_COLUMNS = ("primary_color", "accent_color", "banner_path")
+
+
 async def get_user_profile(user_id: int, guild_id: int) -> dict | None:
-    """Fetches a user's profile customization settings."""
+    """Fetches a user's profile customization settings (only the rank-card columns)."""
 
     def _exec():
         return (
             supabase.table("user_profiles")
-            .select("*")
+            .select(*PROFILE_COLUMNS)
             .eq("user_id", user_id)
             .eq("guild_id", guild_id)
             .execute()
@@ -489,37 +523,55 @@ async def clear_profile_colors(user_id: int, guild_id: int) -> None:
 #
 # --- Leaderboard Functions ---
 #
-async def get_leaderboard(guild_id: int, top: int) -> list[tuple]:
-    """Gets the top users for the leaderboard by total XP."""
+_LEADERBOARD_ROW = itemgetter("user_id", "level", "xp")
+
+
+async def get_leaderboard_page(
+    guild_id: int, offset: int, page_size: int, *, with_count: bool = True
+) -> tuple[list[tuple], int]:
+    """
+    Gets one page of users ranked by total XP, plus the guild's total row count.
+    Rows are sorted and sliced server-side (ORDER BY xp DESC LIMIT/OFFSET).
+    With `with_count=False` the COUNT(*) is skipped and the total is only a lower bound.
+    """
 
     def _exec():
+        columns = ("user_id", "level", "xp")
+        query = (
+            supabase.table("users").select(*columns, count="exact")
+            if with_count
+            else supabase.table("users").select(*columns)
+        )
         return (
-            supabase.table("users")
-            .select("user_id", "level", "xp")
-            .eq("guild_id", guild_id)
+            query.eq("guild_id", guild_id)
             .order("xp", desc=True)
-            .limit(top)
+            .range(offset, offset + page_size - 1)
             .execute()
         )
 
     response = await _db_authed_async(_exec)
-    return [(user["user_id"], user["level"], user["xp"]) for user in response.data]
+    rows = list(map(_LEADERBOARD_ROW, response.data))
+    total = getattr(response, "count", None)
+    return rows, int(total if total is not None else offset + len(rows))
 
 
 #
-async def get_all_xp_ranges() -> dict[int, tuple[int, int]]:
+async def get_all_xp_ranges(
+    all_settings: dict | None = None,
+) -> dict[int, tuple[int, int]]:
     """
     Loads all custom guild XP ranges by processing the main settings dump.
+    Pass an already-fetched dump to skip the round-trip.
     """
-    all_settings = await get_all_guild_settings()
-    xp_ranges: dict[int, tuple[int, int]] = {}
-    for guild_id, settings in all_settings.items():
-        # Ensure both min_xp and max_xp exist before adding
-        min_xp = settings.get("min_xp")
-        max_xp = settings.get("max_xp")
-        if min_xp is not None and max_xp is not None:
-            xp_ranges[guild_id] = (min_xp, max_xp)
-    return xp_ranges
+    if all_settings is None:
+        all_settings = await get_all_guild_settings()
+    # only guilds with both min_xp and max_xp set
+    return {
+        guild_id: (min_xp, max_xp)
+        for guild_id, settings in all_settings.items()
+        if (min_xp := settings.get("min_xp")) is not None
+        and (max_xp := settings.get("max_xp")) is not None
+    }
 
 
 #
@@ -531,18 +583,22 @@ async def update_xp_range(guild_id: int, min_xp: int, max_xp: int):
 #
 # --- Guild Settings ---
 #
-async def get_all_channel_settings() -> dict[int, dict[str, int]]:
+async def get_all_channel_settings(
+    all_settings: dict | None = None,
+) -> dict[int, dict[str, int]]:
     """
     Loads all channel settings by processing the main settings dump.
+    Pass an already-fetched dump to skip the round-trip.
     """
-    all_settings = await get_all_guild_settings()
-    channel_settings: dict[int, dict[str, int]] = {}
-    for guild_id, settings in all_settings.items():
-        channel_settings[guild_id] = {
+    if all_settings is None:
+        all_settings = await get_all_guild_settings()
+    return {
+        guild_id: {
             "welcome": settings.get("welcome_channel_id"),
             "levelup": settings.get("levelup_channel_id"),
         }
-    return channel_settings
+        for guild_id, settings in all_settings.items()
+    }
 
 
 #
@@ -578,166 +634,6 @@ async def get_all_guild_settings() -> dict:
     return {row["guild_id"]: row for row in response.data}
 
 
-# --- Giveaway Functions ---
-
-
-async def create_giveaway(
-    message: discord.Message,
-    prize: str,
-    end_time: datetime,
-    winner_count: int,
-    host: discord.Member,
-) -> None:
-    """Stores a new giveaway in the database."""
-    giveaway_data = {
-        "message_id": message.id,
-        "channel_id": message.channel.id,
-        "guild_id": message.guild.id,
-        "prize": prize,
-        "end_time": end_time.isoformat(),
-        "winner_count": winner_count,
-        "host_id": host.id,
-        "is_active": True,
-    }
-
-    def _exec():
-        supabase.table("giveaways").insert(giveaway_data).execute()
-
-    await _db_authed_async(_exec)
-
-
-async def add_entry(giveaway_id: int, user_id: int) -> tuple[bool, str]:
-    """Adds a user entry to a giveaway. Returns (success, message)."""
-
-    def _exec() -> tuple[bool, str]:
-        try:
-            supabase.table("entries").insert(
-                {"giveaway_id": giveaway_id, "user_id": user_id}
-            ).execute()
-            return (True, "You have entered the giveaway!")
-        except Exception as e:
-            # Check for PostgreSQL's unique_violation error code
-            if "23505" in str(e):
-                return (False, "You have already entered this giveaway!")
-
-            logger.exception("add_entry failed")
-            return (False, "An error occurred while entering the giveaway.")
-
-    return await _db_authed_async(_exec)
-
-
-async def get_entry_count(giveaway_id: int) -> int:
-    def _exec():
-        return (
-            supabase.table("entries")
-            .select("id")
-            .eq("giveaway_id", giveaway_id)
-            .execute()
-        )
-
-    response = await _db_authed_async(_exec)
-    return len(response.data or [])
-
-
-async def get_active_giveaways() -> list:
-    """Fetches all giveaways that are currently active."""
-
-    def _exec():
-        return supabase.table("giveaways").select("*").eq("is_active", True).execute()
-
-    response = await _db_authed_async(_exec)
-    return response.data
-
-
-async def get_giveaway_entrants(giveaway_id: int) -> list[int]:
-    """Gets a list of user IDs for all entrants of a giveaway."""
-
-    def _exec():
-        return (
-            supabase.table("entries")
-            .select("user_id")
-            .eq("giveaway_id", giveaway_id)
-            .execute()
-        )
-
-    response = await _db_authed_async(_exec)
-    return [entry["user_id"] for entry in response.data]
-
-
-async def end_giveaway(message_id: int) -> bool:
-    """Atomically marks a giveaway as inactive. Returns True if a row was changed."""
-
-    def _exec():
-        return (
-            supabase.table("giveaways")
-            .update({"is_active": False}, returning="representation")
-            .eq("message_id", message_id)
-            .eq("is_active", True)
-            .execute()
-        )
-
-    res = await _db_authed_async(_exec)
-    return bool(res.data)
-
-
-async def get_giveaway_by_id(message_id: int) -> dict | None:
-    """Fetches a single giveaway by its message ID."""
-
-    def _exec():
-        return (
-            supabase.table("giveaways")
-            .select("*")
-            .eq("message_id", message_id)
-            .limit(1)
-            .execute()
-        )
-
-    resp = await _db_authed_async(_exec)
-    return resp.data[0] if resp.data else None
-
-
-async def list_active_giveaways_for_guild(guild_id: int) -> list[dict]:
-    """Lists all active giveaways for a specific guild."""
-
-    def _exec():
-        return (
-            supabase.table("giveaways")
-            .select("*")
-            .eq("guild_id", guild_id)
-            .eq("is_active", True)
-            .order("end_time", desc=False)
-            .execute()
-        )
-
-    resp = await _db_authed_async(_exec)
-    return resp.data
-
-
-async def set_giveaway_end_time_now(message_id: int) -> None:
-    """Updates a giveaway's end time to the current time."""
-
-    def _exec():
-        supabase.table("giveaways").update(
-            {"end_time": datetime.now(timezone.utc).isoformat()}
-        ).eq("message_id", message_id).execute()
-
-    await _db_authed_async(_exec)
-
-
-async def get_due_giveaways(now_iso: str) -> list[dict]:
-    def _exec():
-        return _retry_sync(
-            lambda: supabase.table("giveaways")
-            .select("*")
-            .eq("is_active", True)
-            .lte("end_time", now_iso)
-            .execute()
-        )
-
-    resp = await _db_authed_async(_exec)
-    return resp.data
-
-
 async def upload_rank_banner(
     user_id: int, guild_id: int, data: bytes, mime: str, ext: str
 ) -> str:
@@ -0,0 +1,257 @@
+# src/data/giveaways.py
+import asyncio
+from datetime import datetime, timezone
+
+import discord
+
+from data.database import _db_authed_async, _retry_sync, supabase
+from helpers.logging_helper import get_logger
+
+logger = get_logger("database.giveaways")
+
+# giveaway_id -> user ids whose entry is in the table; dropped when the giveaway ends
+_ENTRANTS: dict[int, set[int]] = {}
+# (giveaway_id, user_id) of entries queued or being written, not yet confirmed
+_QUEUED_ENTRANTS: set[tuple[int, int]] = set()
+# entry rows waiting for the next batched insert, each with its caller's future
+_PENDING_ENTRIES: list[tuple[dict, asyncio.Future]] = []
+# scheduled batch writes, referenced here so they aren't garbage collected mid-sleep
+_ENTRY_FLUSHES: set[asyncio.Task] = set()
+ENTRY_FLUSH_DELAY = 0.5  # seconds an entry waits so a burst shares one insert
+
+
+async def create_giveaway(
+    message: discord.Message,
+    prize: str,
+    end_time: datetime,
+    winner_count: int,
+    host: discord.Member,
+) -> None:
+    """Stores a new giveaway in the database."""
+    giveaway_data = {
+        "message_id": message.id,
+        "channel_id": message.channel.id,
+        "guild_id": message.guild.id,
+        "prize": prize,
+        "end_time": end_time.isoformat(),
+        "winner_count": winner_count,
+        "host_id": host.id,
+        "is_active": True,
+    }
+
+    def _exec():
+        supabase.table("giveaways").insert(giveaway_data).execute()
+
+    await _db_authed_async(_exec)
+
+
+async def add_entry(giveaway_id: int, user_id: int) -> tuple[bool, str]:
+    """
+    Adds a user entry to a giveaway. Returns (success, message).
+
+    Duplicates are answered from the in-memory entrant set (seeded from the DB
+    on a giveaway's first entry) and the queued entries. A new entry is queued
+    and written together with any others arriving within ENTRY_FLUSH_DELAY
+    seconds; the call returns once that batched insert has succeeded or failed,
+    and only a written entry joins the entrant set.
+    """
+    entrants = _ENTRANTS.get(giveaway_id)
+    if entrants is None:
+        try:
+            known = await get_giveaway_entrants(giveaway_id)
+        except Exception:
+            logger.exception("add_entry failed")
+            return (False, "An error occurred while entering the giveaway.")
+        entrants = _ENTRANTS.setdefault(giveaway_id, set(known))
+
+    if user_id in entrants or (giveaway_id, user_id) in _QUEUED_ENTRANTS:
+        return (False, "You have already entered this giveaway!")
+
+    _QUEUED_ENTRANTS.add((giveaway_id, user_id))
+    written = asyncio.get_running_loop().create_future()
+    _PENDING_ENTRIES.append(({"giveaway_id": giveaway_id, "user_id": user_id}, written))
+    if len(_PENDING_ENTRIES) == 1:
+        # the first entry of a batch schedules its write
+        flush = asyncio.create_task(_flush_entries_later())
+        _ENTRY_FLUSHES.add(flush)
+        flush.add_done_callback(_ENTRY_FLUSHES.discard)
+
+    try:
+        await written
+    except Exception:
+        # logged once for the whole batch by whoever ran the write
+        return (False, "An error occurred while entering the giveaway.")
+    return (True, "You have entered the giveaway!")
+
+
+async def _flush_entries_later() -> None:
+    await asyncio.sleep(ENTRY_FLUSH_DELAY)
+    try:
+        await flush_entries()
+    except Exception:
+        # every add_entry waiting on this batch reports the failure to its user
+        logger.exception("Batched giveaway entry write failed")
+
+
+async def flush_entries() -> None:
+    """
+    Write every queued giveaway entry in one insert (duplicates are ignored).
+
+    Written entries join the entrant set. Raises if the insert fails; the
+    entries are then dropped so the users can press the button again.
+    """
+    if not _PENDING_ENTRIES:
+        return
+    batch = _PENDING_ENTRIES.copy()
+    _PENDING_ENTRIES.clear()
+    rows = [row for row, _ in batch]
+
+    def _exec():
+        return (
+            supabase.table("entries")
+            .upsert(rows, on_conflict="giveaway_id,user_id", ignore_duplicates=True)
+            .execute()
+        )
+
+    try:
+        await _db_authed_async(_exec)
+    except Exception as e:
+        for row, written in batch:
+            _QUEUED_ENTRANTS.discard((row["giveaway_id"], row["user_id"]))
+            if not written.done():
+                written.set_exception(e)
+        raise
+
+    for row, written in batch:
+        _QUEUED_ENTRANTS.discard((row["giveaway_id"], row["user_id"]))
+        entrants = _ENTRANTS.get(row["giveaway_id"])
+        if entrants is not None:
+            entrants.add(row["user_id"])
+        if not written.done():
+            written.set_result(None)
+
+
+async def get_entry_count(giveaway_id: int) -> int:
+    """
+    Entrant count, from the in-memory entrant set once this giveaway has one.
+    Entries still queued for the batched insert are not counted until written.
+    """
+    entrants = _ENTRANTS.get(giveaway_id)
+    if entrants is not None:
+        return len(entrants)
+
+    def _exec():
+        return (
+            supabase.table("entries")
+            .select("id", count="exact", head=True)
+            .eq("giveaway_id", giveaway_id)
+            .execute()
+        )
+
+    response = await _db_authed_async(_exec)
+    return int(getattr(response, "count", None) or 0)
+
+
+async def get_active_giveaways() -> list:
+    """Fetches all giveaways that are currently active."""
+
+    def _exec():
+        return supabase.table("giveaways").select("*").eq("is_active", True).execute()
+
+    response = await _db_authed_async(_exec)
+    return response.data
+
+
+async def get_giveaway_entrants(giveaway_id: int) -> list[int]:
+    """
+    Gets a list of user IDs for all entrants of a giveaway. Raises if queued
+    entries cannot be written first, rather than return a partial list.
+    """
+    # queued entries must be in the table before anyone reads it
+    await flush_entries()
+
+    def _exec():
+        return (
+            supabase.table("entries")
+            .select("user_id")
+            .eq("giveaway_id", giveaway_id)
+            .execute()
+        )
+
+    response = await _db_authed_async(_exec)
+    return [entry["user_id"] for entry in response.data]
+
+
+async def end_giveaway(message_id: int) -> bool:
+    """Atomically marks a giveaway as inactive. Returns True if a row was changed."""
+
+    def _exec():
+        return (
+            supabase.table("giveaways")
+            .update({"is_active": False}, returning="representation")
+            .eq("message_id", message_id)
+            .eq("is_active", True)
+            .execute()
+        )
+
+    res = await _db_authed_async(_exec)
+    _ENTRANTS.pop(message_id, None)
+    return bool(res.data)
+
+
+async def get_giveaway_by_id(message_id: int) -> dict | None:
+    """Fetches a single giveaway by its message ID."""
+
+    def _exec():
+        return (
+            supabase.table("giveaways")
+            .select("*")
+            .eq("message_id", message_id)
+            .limit(1)
+            .execute()
+        )
+
+    resp = await _db_authed_async(_exec)
+    return resp.data[0] if resp.data else None
+
+
+async def list_active_giveaways_for_guild(guild_id: int) -> list[dict]:
+    """Lists all active giveaways for a specific guild."""
+
+    def _exec():
+        return (
+            supabase.table("giveaways")
+            .select("*")
+            .eq("guild_id", guild_id)
+            .eq("is_active", True)
+            .order("end_time", desc=False)
+            .execute()
+        )
+
+    resp = await _db_authed_async(_exec)
+    return resp.data
+
+
+async def set_giveaway_end_time_now(message_id: int) -> None:
+    """Updates a giveaway's end time to the current time."""
+
+    def _exec():
+        supabase.table("giveaways").update(
+            {"end_time": datetime.now(timezone.utc).isoformat()}
+        ).eq("message_id", message_id).execute()
+
+    await _db_authed_async(_exec)
+
+
+async def get_due_giveaways(now_iso: str) -> list[dict]:
+    def _exec():
+        return _retry_sync(
+            lambda: supabase.table("giveaways")
+            .select("*")
+            .eq("is_active", True)
+            .lte("end_time", now_iso)
+            .execute()
+        )
+
+    resp = await _db_authed_async(_exec)
+    return resp.data
@@ -1,17 +1,28 @@
 # src/helpers/banner_helper.py
+import asyncio
 from io import BytesIO
 
 import discord
-from PIL import Image, ImageDraw, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageOps
 
 import config
+from helpers.logging_helper import get_logger
+from utility import image_utils
+from utility.cache_utils import TTLCache
 from utility.image_utils import (
     hex_to_rgb,
     _load_font,
     draw_text,
+    get_font,
     make_glow_image_segments,
 )
-from utility.level_utils import RankCardData
+from utility.level_utils import LevelupBannerJob, RankCardData
+
+log = get_logger("leveling")
+
+# Level-up banners are rendered by background workers, off the on_message path.
+LEVELUP_QUEUE_SIZE = 256
+LEVELUP_WORKERS = 2
 
 
 async def generate_levelup_banner(user: discord.User, new_role: str) -> discord.File:
@@ -29,7 +40,7 @@ async def generate_levelup_banner(user: discord.User, new_role: str) -> discord.
     ]
 
     for size in range(64, 9, -2):
-        fonts = [ImageFont.truetype(fp, size) for _, fp in segments]
+        fonts = [get_font(str(fp), size) for _, fp in segments]
         total_w = sum(
             draw.textlength(txt, font=font) for (txt, _), font in zip(segments, fonts)
         )
@@ -46,10 +57,15 @@ async def generate_levelup_banner(user: discord.User, new_role: str) -> discord.
     return discord.File(fp=buf, filename="levelup.png")
 
 
-# pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals,too-many-branches,too-many-statements
 async def generate_rank_card(data: RankCardData) -> discord.File:
+    """Render a rank card and wrap it as a ready-to-send `discord.File`."""
+    return discord.File(fp=BytesIO(await render_rank_card(data)), filename="rank.png")
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals,too-many-branches,too-many-statements
+async def render_rank_card(data: RankCardData) -> bytes:
     """
-    Generates a rank card. Supports optional custom banner background and theming via hex colors.
+    Renders a rank card to PNG bytes. Supports optional custom banner background and theming via hex colors.
     - primary_color : affects large headings / totals (default white)
     - accent_color  : affects rank label and XP bar color (default golden/yellow)
     - banner_bytes  : used as the card background with a soft dark overlay
@@ -253,5 +269,92 @@ async def generate_rank_card(data: RankCardData) -> discord.File:
 
     buf = BytesIO()
     final_canvas.save(buf, format="PNG")
-    buf.seek(0)
-    return discord.File(fp=buf, filename="rank.png")
+    return buf.getvalue()
+
+
+class LevelupBanners:
+    """Queue of level-up banners, rendered and sent by background workers."""
+
+    def __init__(self):
+        self.queue: asyncio.Queue[LevelupBannerJob] = asyncio.Queue(
+            maxsize=LEVELUP_QUEUE_SIZE
+        )
+        self._workers: list[asyncio.Task] = []
+        self._bases: dict[tuple[int, str], image_utils.GlowBase] = {}
+        # finished banners, so a repeat (same role, same name) skips Pillow entirely
+        self._banners: TTLCache[bytes] = TTLCache(maxsize=128)
+
+    def start(self) -> None:
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(LEVELUP_WORKERS)
+        ]
+
+    def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers.clear()
+
+    def submit(self, job: LevelupBannerJob) -> bool:
+        """Queue `job`; False when the queue is full and the banner was dropped."""
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _worker(self) -> None:
+        """Drain queued level-up banners until cancelled."""
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.send(job)
+            except discord.Forbidden:
+                log.warning("Missing permissions to send level-up banner")
+            except Exception:
+                log.exception("Failed to send level-up banner for %s", job.display_name)
+            finally:
+                self.queue.task_done()
+
+    async def send(self, job: LevelupBannerJob) -> None:
+        base_key = (job.role_id, job.role_name)
+        banner_key = (*base_key, job.display_name)
+        banner = self._banners.get(banner_key)
+        if banner is None:
+            banner = await self._render(job, base_key)
+            self._banners.set(banner_key, banner)
+
+        await job.channel.send(
+            file=discord.File(fp=BytesIO(banner), filename="rankup.jpg"),
+            allowed_mentions=discord.AllowedMentions(users=True),
+        )
+
+    async def _render(self, job: LevelupBannerJob, base_key: tuple[int, str]) -> bytes:
+        # The glowing "promoted to" lines only depend on the role, so they are
+        # rendered once per role; the player's name is drawn on top per level-up.
+        base = self._bases.get(base_key)
+        if base is None:
+            lines = [
+                [("", config.BOLD_ITALIC_FONT_PATH)],  # reserved for the player line
+                [("has been promoted to an ", config.REGULAR_FONT_PATH)],
+                [(f"{job.role_name}.", config.BOLD_ITALIC_FONT_PATH)],
+            ]
+            base = await asyncio.to_thread(
+                image_utils.make_multiline_glow_base,
+                config.LEVELUP_BANNER_PATH,
+                lines,
+                max_font_size=50,
+                glow_radii=(20, 40, 80),
+                v_pad=8,
+            )
+            self._bases[base_key] = base
+
+        buf = await asyncio.to_thread(
+            image_utils.draw_line_on_base,
+            base,
+            0,
+            [
+                ("Player ", config.REGULAR_FONT_PATH),
+                (job.display_name, config.BOLD_ITALIC_FONT_PATH),
+            ],
+        )
+        return buf.getvalue()
@@ -3,34 +3,55 @@ import logging
 import time
 from typing import Optional
 import os
-from dotenv import load_dotenv
 
 import aiohttp
 
+from utility.cache_utils import TTLCache
+from utility.env_utils import load_env
 from utility.level_utils import build_public_storage_url
 
-load_dotenv()
+load_env()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 
-_banner_cache: dict[str, tuple[float, bytes]] = {}
-_BANNER_TTL = 600.0  # seconds
+# banner_path -> (fetched_at, etag, bytes); bounded LRU, freshness tracked per entry
+_BANNER_CACHE: TTLCache[tuple[float, Optional[str], bytes]] = TTLCache(maxsize=256)
+_BANNER_TTL = 600.0  # seconds before an entry is revalidated with the ETag
+
+
+async def fetch_head_bytes(url: str, n: int = 16) -> Optional[bytes]:
+    """Fetch only the first `n` bytes of `url` with a Range request (None on failure)."""
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, headers={"Range": f"bytes=0-{n - 1}"}) as resp:
+                if resp.status not in (200, 206):
+                    return None
+                return await resp.content.read(n)
+    except aiohttp.ClientError:
+        return None
 
 
 async def fetch_banner_bytes(banner_path: str) -> Optional[bytes]:
     if not banner_path:
         return None
 
-    now = time.time()
-    cached = _banner_cache.get(banner_path)
+    now = time.monotonic()
+    cached = _BANNER_CACHE.get(banner_path)
     if cached and now - cached[0] < _BANNER_TTL:
-        return cached[1]
+        return cached[2]
+
+    headers = {}
+    if cached and cached[1]:
+        headers["If-None-Match"] = cached[1]
 
     url = build_public_storage_url("rank-banners", banner_path)
     async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 304 and cached:
+                _BANNER_CACHE.set(banner_path, (now, cached[1], cached[2]))
+                return cached[2]
             if resp.status == 200:
                 data = await resp.read()
-                _banner_cache[banner_path] = (now, data)
+                _BANNER_CACHE.set(banner_path, (now, resp.headers.get("ETag"), data))
                 return data
 
     logging.warning("Banner fetch failed: %s", url)
@@ -0,0 +1,167 @@
+# src/helpers/xp_buffer.py
+import asyncio
+import random
+import time
+import uuid
+from array import array
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from data import database
+from helpers.logging_helper import get_logger
+from utility.cache_utils import TTLCache
+
+log = get_logger("leveling")
+xp_logger = get_logger("leveling.xp")
+
+# XP gains are buffered in memory and written in one batch per flush.
+XP_FLUSH_SECONDS = 5
+XP_FLUSH_MAX_PENDING = 500
+# After a failed flush, flushes pause 10s, 20s, ... (capped) before trying again.
+XP_FLUSH_BACKOFF_MAX = 300.0
+
+# Running XP totals for active users, so the message path needs no SELECT.
+XP_CACHE_SIZE = 50_000
+XP_CACHE_TTL = 3600.0
+
+# XP gains are rolled in bulk and handed out one per message.
+XP_POOL_SIZE = 10_000
+
+# daily XP counts toward the ET calendar date it was earned on
+ET = ZoneInfo("America/New_York")
+
+Key = tuple[int, int]  # (guild_id, user_id)
+DayKey = tuple[int, int, str]  # (guild_id, user_id, ET date the XP was earned)
+
+
+def et_today() -> str:
+    """Today's ET calendar date (YYYY-MM-DD), the daily_xp row new gains go to."""
+    return datetime.now(ET).date().isoformat()
+
+
+def _owed(deltas: dict[DayKey, int], key: Key) -> int:
+    return sum(delta for (g, u, _), delta in deltas.items() if (g, u) == key)
+
+
+class XpBuffer:
+    """
+    The leveling cog's XP state between the message path and the DB: running
+    totals, pre-rolled gains, and gains waiting for the next batched write.
+    """
+
+    def __init__(self):
+        # running total XP / XP not yet written to the DB
+        self.totals: TTLCache[int] = TTLCache(maxsize=XP_CACHE_SIZE, ttl=XP_CACHE_TTL)
+        self.pending: dict[DayKey, int] = {}
+        # (batch id, deltas) of a flush that failed; resent unchanged before new gains
+        self.batch: tuple[str, dict[DayKey, int]] | None = None
+        self.early_flush: asyncio.Task | None = None  # size-triggered flush in flight
+        self.retry_at = 0.0  # monotonic; no timed/early flush before this
+        self._failures = 0
+        self._lock = asyncio.Lock()
+        self._flushes = 0  # flushes started; lets a DB read tell if one overlapped it
+        # (min_xp, max_xp) -> [pre-rolled gains, next index]; a new range gets its own
+        self._pools: dict[tuple[int, int], list] = {}
+
+    def roll(self, xp_range: tuple[int, int]) -> int:
+        """Next XP gain for `xp_range`, drawn from a pre-rolled pool of gains."""
+        pool = self._pools.get(xp_range)
+        if pool is None or pool[1] >= XP_POOL_SIZE:
+            lo, hi = xp_range
+            pool = [array("i", random.choices(range(lo, hi + 1), k=XP_POOL_SIZE)), 0]
+            self._pools[xp_range] = pool
+        gains, i = pool
+        pool[1] = i + 1
+        return gains[i]
+
+    async def add(self, key: Key, gain: int) -> tuple[int, int]:
+        """Buffer `gain` for `key`; returns the running total before and after."""
+        current = self.totals.get(key)
+        if current is None:
+            current = await self._seed(key)
+        total = current + gain
+        self.totals.set(key, total)
+
+        # written by the next flush together with everyone else's gains, under the
+        # day they were earned even if that flush lands after midnight
+        day_key = (*key, et_today())
+        self.pending[day_key] = self.pending.get(day_key, 0) + gain
+        if (
+            len(self.pending) >= XP_FLUSH_MAX_PENDING
+            and (self.early_flush is None or self.early_flush.done())
+            and time.monotonic() >= self.retry_at
+        ):
+            self.early_flush = asyncio.create_task(self.flush())
+        return current, total
+
+    async def _seed(self, key: Key) -> int:
+        """First gain seen for `key`: its DB total plus anything not yet flushed."""
+        # a flush that lands mid-read leaves its gains in both the row and
+        # pending/batch (or in neither), so only trust a read no flush overlapped
+        while True:
+            if self._lock.locked():
+                async with self._lock:
+                    pass
+                continue
+            flushes = self._flushes
+            user_data = await database.get_user(key[1], key[0])
+            if flushes == self._flushes:
+                return (user_data[0] if user_data else 0) + self.unflushed(key)
+
+    def unflushed(self, key: Key) -> int:
+        """XP for `key` that the DB has not confirmed yet (buffered or being retried)."""
+        unflushed = _owed(self.pending, key)
+        if self.batch is not None:
+            unflushed += _owed(self.batch[1], key)
+        return unflushed
+
+    def forget(self, key: Key) -> None:
+        """Drop a cached running total so the next gain re-reads it from the DB."""
+        self.totals.pop(key)
+
+    async def flush_due(self) -> None:
+        """Timed flush; skipped while backing off after a failed one."""
+        if time.monotonic() >= self.retry_at:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write all buffered XP gains (total + daily) in a single batched call."""
+        async with self._lock:
+            self._flushes += 1
+            # a failed batch goes first, unchanged and under its own id, so the RPC
+            # can drop it if the earlier attempt committed after we stopped waiting
+            if self.batch is not None and not await self._send_batch():
+                return
+            if not self.pending:
+                return
+            self.batch = (str(uuid.uuid4()), self.pending)
+            self.pending = {}
+            await self._send_batch()
+
+    async def _send_batch(self) -> bool:
+        """Send the held batch; True once the DB has it, False to retry later."""
+        batch_id, deltas = self.batch
+        rows = [
+            {"guild_id": guild_id, "user_id": user_id, "delta": delta, "day": day}
+            for (guild_id, user_id, day), delta in deltas.items()
+        ]
+
+        try:
+            await database.bulk_add_xp(rows, batch_id=batch_id)
+        except Exception:
+            self._failures += 1
+            backoff = min(XP_FLUSH_BACKOFF_MAX, XP_FLUSH_SECONDS * 2**self._failures)
+            self.retry_at = time.monotonic() + backoff
+            log.exception(
+                "XP flush failed for %d users; retrying batch %s in %.0fs",
+                len(rows),
+                batch_id,
+                backoff,
+            )
+            return False
+
+        self.batch = None
+        self._failures = 0
+        self.retry_at = 0.0
+        xp_logger.debug("Flushed XP for %d users", len(rows))
+        return True
@@ -126,8 +126,8 @@ def _validate_template(gid: str, template: str) -> str:
 
 
 def _env_overrides(messages: Dict[str, str]) -> Dict[str, str]:
-    if os.getenv("WELCOME_MESSAGE_DEFAULT"):
-        messages["default"] = os.getenv("WELCOME_MESSAGE_DEFAULT")
+    if default := os.getenv("WELCOME_MESSAGE_DEFAULT"):
+        messages["default"] = default
 
     for key, val in os.environ.items():
         if key.startswith("WELCOME_MESSAGE_") and key != "WELCOME_MESSAGE_DEFAULT":
@@ -139,7 +139,7 @@ def _env_overrides(messages: Dict[str, str]) -> Dict[str, str]:
 
 def _find_json_file() -> Path | None:
     for candidate in JSON_LOCATIONS:
-        if candidate.exists():
+        if candidate.is_file():
             log.info("welcome messages file: %s", candidate)
             return candidate
     log.warning("welcome messages file not found; using in-code defaults")
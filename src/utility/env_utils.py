@@ -0,0 +1,10 @@
+# utility/env_utils.py
+from functools import cache
+
+from dotenv import load_dotenv
+
+
+@cache
+def load_env() -> None:
+    """Parse `.env` into os.environ once per process, however many modules ask."""
+    load_dotenv()
@@ -1,4 +1,5 @@
 import hashlib
+from functools import lru_cache
 from io import BytesIO
 from typing import Optional, Tuple, Union
 from dataclasses import dataclass
@@ -6,20 +7,22 @@ from dataclasses import dataclass
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageChops, ImageOps
 
 import config
+from helpers.logging_helper import get_logger
 
+log = get_logger("image")
 
 Color = Union[str, Tuple[int, int, int], Tuple[int, int, int, int]]
 FontType = Union[ImageFont.FreeTypeFont, ImageFont.ImageFont]
 MAX_PIXELS = config.MAX_PIXELS
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True, frozen=True)
 class GlowStyle:
     color: tuple[int, int, int, int] = (0, 204, 254, 255)
     radii: tuple[int, int, int] = (20, 40, 80)
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True, frozen=True)
 class TextRun:
     text: str
     font: FontType
@@ -77,10 +80,39 @@ def sniff_ext_and_mime(
     return ("jpg", "image/jpeg")
 
 
-def safe_open(raw: bytes) -> Image.Image:
-    """Safely open uploaded image; guard size, normalize EXIF orientation, use first frame."""
+def sniff_image_mime(head: bytes) -> Optional[str]:
+    """Identify PNG/JPEG/WebP from the first bytes of a file; None if it is none of them."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def safe_open(raw: bytes, draft_size: tuple[int, int] | None = None) -> Image.Image:
+    """
+    Safely open uploaded image; guard size, normalize EXIF orientation, use first frame.
+
+    `draft_size` lets JPEGs be decoded at a reduced 1/2, 1/4 or 1/8 scale that still
+    covers that size, instead of at full resolution.
+    """
     Image.MAX_IMAGE_PIXELS = MAX_PIXELS
-    img = Image.open(BytesIO(raw))
+    img = Image.open(BytesIO(raw))  # lazy: only the header has been parsed here
+    if img.width * img.height > MAX_PIXELS:
+        # Pillow only errors past 2x its limit; refuse before any pixel is decoded
+        raise Image.DecompressionBombError(
+            f"Image has {img.width * img.height} pixels, limit is {MAX_PIXELS}."
+        )
+    if draft_size and img.format == "JPEG":
+        try:
+            # orientations 5-8 are rotated by 90°, so the box is swapped pre-transpose
+            if img.getexif().get(0x0112) in (5, 6, 7, 8):
+                draft_size = (draft_size[1], draft_size[0])
+            img.draft("RGB", draft_size)
+        except Exception:
+            pass
     try:
         if getattr(img, "is_animated", False):
             img.seek(0)
@@ -93,9 +125,12 @@ def safe_open(raw: bytes) -> Image.Image:
     return img
 
 
-def encode_webp(img: Image.Image, *, lossless: bool, quality: int = 85) -> bytes:
+def encode_webp(
+    img: Image.Image, *, lossless: bool, quality: int = 85, method: int = 6
+) -> bytes:
+    """`method` trades speed for size: 0 is fastest, 6 (the default) smallest."""
     out = BytesIO()
-    params = {"format": "WEBP", "method": 6}  # literal instead of dict()
+    params = {"format": "WEBP", "method": method}  # literal instead of dict()
     if lossless:
         params["lossless"] = True
     else:
@@ -110,22 +145,90 @@ def encode_jpeg(img: Image.Image, *, quality: int = 85) -> bytes:
     return out.getvalue()
 
 
+# pylint: disable=too-many-arguments
+def process_banner_bytes(
+    raw: bytes,
+    prefer_webp: bool = True,
+    *,
+    target_size: Tuple[int, int] = (config.CARD_WIDTH, config.CARD_HEIGHT),
+    centering: Tuple[float, float] = (0.5, 0.5),  # 0..1
+    darken_overlay_rgba: tuple[int, int, int, int] | None = None,
+    jpeg_bg: tuple[int, int, int] = (0, 0, 0),
+) -> tuple[bytes, str, str]:
+    """
+    Return (processed_bytes, mime, ext) cropped to exactly `target_size` via cover scaling.
+
+    Runs in the leveling cog's banner worker processes, which import only this module.
+    """
+    # 1) Open safely & normalize (JPEGs decode straight at >= 2x the box)
+    img = safe_open(
+        raw, draft_size=(target_size[0] * 2, target_size[1] * 2)
+    ).convert("RGBA")
+
+    # 2) Cheap integer box downsample of large sources (still >= 2x the box on
+    #    both axes), so LANCZOS only runs on a near-target-sized image
+    factor = min(img.width // (2 * target_size[0]), img.height // (2 * target_size[1]))
+    if factor > 1:
+        img = img.reduce(factor)
+
+    # 3) Cover scale + crop to the banner box (already-sized banners pass through;
+    #    upscales use BICUBIC, LANCZOS only pays off when shrinking)
+    if img.size != target_size:
+        shrinking = img.width > target_size[0] and img.height > target_size[1]
+        img = ImageOps.fit(
+            img,
+            target_size,
+            method=(
+                Image.Resampling.LANCZOS if shrinking else Image.Resampling.BICUBIC
+            ),
+            centering=centering,
+        )
+
+    # 4) Optional overlay to help white text pop
+    if darken_overlay_rgba:
+        overlay = Image.new("RGBA", img.size, darken_overlay_rgba)
+        img = Image.alpha_composite(img, overlay)
+
+    # 5) Pick format & encode
+    has_alpha = img.mode == "RGBA"
+    ext, mime = sniff_ext_and_mime(img.format or "", has_alpha, prefer_webp=prefer_webp)
+
+    if ext == "webp":
+        # method 4 (libwebp's own default) encodes several times faster than 6
+        # for a few percent larger files
+        out_bytes = encode_webp(img, lossless=has_alpha, quality=85, method=4)
+        return out_bytes, mime, ext
+
+    # JPEG path: flatten first
+    jpg_img = flatten_rgba_to_rgb(img, bg=jpeg_bg)
+    out_bytes = encode_jpeg(jpg_img, quality=85)
+    return out_bytes, mime, ext
+
+
 def hash_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
 
+@lru_cache(maxsize=256)
+def get_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    """Open a TrueType font once per (path, size) so FreeType faces are reused across renders."""
+    return ImageFont.truetype(str(path), size)
+
+
+@lru_cache(maxsize=64)
 def _load_font(size: int):
+    """Resolve the regular font on first render; a missing file is only probed once."""
     candidates = config.REGULAR_FONT_PATH
     if not isinstance(candidates, (list, tuple)):
         candidates = [candidates]
 
     for fp in candidates:
         try:
-            return ImageFont.truetype(str(fp), size)
+            return get_font(str(fp), size)
         except OSError as e:
-            print(f"failed to load font {fp}: {e}")
+            log.warning("failed to load font %s: %s", fp, e)
             continue
-    print("falling back to default font")
+    log.warning("falling back to default font")
     return ImageFont.load_default()
 
 
@@ -195,83 +298,203 @@ def draw_text(
     return spec
 
 
-# pylint: disable=too-many-locals
-def make_multiline_glow(
-    template_path: str,
-    lines: list[
-        list[tuple[str, str]]
-    ],  # list of lines, each a list of (text, font_path)
-    max_font_size: int = 50,
-    glow_radii: tuple[int, int, int] = (20, 40, 80),
-    v_pad: int = 8,  # vertical padding between lines
-) -> BytesIO:
-    base = Image.open(template_path).convert("RGBA")
-    w, h = base.size
-    draw = ImageDraw.Draw(base)
+GLOW_COLOR = (0, 204, 254, 255)
+TEXT_COLOR = (255, 255, 255, 255)
 
-    # 1) Autoscale: find a size that fits every line under 50% width
+Line = list[tuple[str, str]]  # a line is a list of (text, font_path) segments
+
+
+@dataclass(slots=True, frozen=True)
+class GlowBase:
+    """A pre-rendered glow banner plus the layout needed to draw more text on it."""
+
+    png: bytes
+    font_size: int
+    line_tops: tuple[int, ...]
+
+
+def _fit_font_size(
+    draw: ImageDraw.ImageDraw, width: int, lines: list[Line], max_font_size: int
+) -> int:
+    """Largest size (stepping by 2) at which every line stays under 50% width."""
     chosen = max_font_size
     while chosen > 8:
         too_wide = False
         for line in lines:
-            fnts = [ImageFont.truetype(str(fp), chosen) for _, fp in line]
+            fnts = [get_font(str(fp), chosen) for _, fp in line]
             total_w = sum(
                 draw.textlength(txt, font=f) for (txt, _), f in zip(line, fnts)
             )
-            if total_w > w * 0.50:
+            if total_w > width * 0.50:
                 too_wide = True
                 break
         if not too_wide:
             break
         chosen -= 2
+    return chosen
+
+
+def _draw_lines(
+    ctx: ImageDraw.ImageDraw,
+    width: int,
+    lines: list[Line],
+    *,
+    fonts_list: list[list[FontType]],
+    widths_list: list[list[float]],
+    line_tops: list[int],
+    fill: tuple[int, int, int, int],
+) -> None:
+    for line, fonts, widths, y in zip(lines, fonts_list, widths_list, line_tops):
+        x = (width - sum(widths)) // 2
+        for (txt, _), f, seg_w in zip(line, fonts, widths):
+            if txt:
+                ctx.text((x, y), txt, font=f, fill=fill)
+            x += seg_w
+
+
+@lru_cache(maxsize=8)
+def _load_template(path: str) -> Image.Image:
+    """Decode a banner template once; callers must .copy() before drawing on it."""
+    with Image.open(path) as img:
+        return img.convert("RGBA")
+
+
+# pylint: disable=too-many-locals
+def _render_multiline_glow(
+    template_path: str,
+    lines: list[Line],
+    max_font_size: int,
+    glow_radii: tuple[int, ...],
+    v_pad: int,
+) -> tuple[Image.Image, int, list[int]]:
+    """Return (image, chosen font size, top Y of each line)."""
+    base = _load_template(template_path).copy()
+    w, h = base.size
+    draw = ImageDraw.Draw(base)
+
+    # 1) Autoscale: find a size that fits every line under 50% width
+    chosen = _fit_font_size(draw, w, lines, max_font_size)
 
     fonts_list = [
-        [ImageFont.truetype(str(fp), chosen) for _, fp in line] for line in lines
+        [get_font(str(fp), chosen) for _, fp in line] for line in lines
     ]
     widths_list = [
         [draw.textlength(txt, font=f) for (txt, _), f in zip(line, fonts_list[i])]
         for i, line in enumerate(lines)
     ]
     line_heights = [
-        max(f.getmetrics()[0] + f.getmetrics()[1] for f in fonts_list[i])
+        max(sum(f.getmetrics()) for f in fonts_list[i])
         for i in range(len(lines))
     ]
 
     # 3) Compute total text-block height & center start-Y
     total_h = sum(line_heights) + v_pad * (len(lines) - 1)
-    y0 = (h - total_h) // 2
-
-    # 4) Build glow layer
+    line_tops = []
+    y = (h - total_h) // 2
+    for lh in line_heights:
+        line_tops.append(y)
+        y += lh + v_pad
+
+    # 4) Build glow layer: the text is drawn once and blurred at every radius
+    layer = Image.new("RGBA", base.size, (0, 0, 0, 0))
+    _draw_lines(
+        ImageDraw.Draw(layer),
+        w,
+        lines,
+        fonts_list=fonts_list,
+        widths_list=widths_list,
+        line_tops=line_tops,
+        fill=GLOW_COLOR,
+    )
     glow = Image.new("RGBA", base.size, (0, 0, 0, 0))
     for r in glow_radii:
-        layer = Image.new("RGBA", base.size, (0, 0, 0, 0))
-        ld = ImageDraw.Draw(layer)
-        y = y0
-        for i, line in enumerate(lines):
-            x = (w - sum(widths_list[i])) // 2
-            for (txt, _), f, seg_w in zip(line, fonts_list[i], widths_list[i]):
-                ld.text((x, y), txt, font=f, fill=(0, 204, 254, 255))
-                x += seg_w
-            y += line_heights[i] + v_pad
         glow = ImageChops.add(glow, layer.filter(ImageFilter.GaussianBlur(r)))
 
     # 5) Composite & draw crisp text
     combined = ImageChops.add(base, glow)
-    fd = ImageDraw.Draw(combined)
-    y = y0
-    for i, line in enumerate(lines):
-        x = (w - sum(widths_list[i])) // 2
-        for (txt, _), f, seg_w in zip(line, fonts_list[i], widths_list[i]):
-            fd.text((x, y), txt, font=f, fill=(255, 255, 255, 255))
-            x += seg_w
-        y += line_heights[i] + v_pad
+    _draw_lines(
+        ImageDraw.Draw(combined),
+        w,
+        lines,
+        fonts_list=fonts_list,
+        widths_list=widths_list,
+        line_tops=line_tops,
+        fill=TEXT_COLOR,
+    )
+    return combined, chosen, line_tops
+
 
+def make_multiline_glow(
+    template_path: str,
+    lines: list[Line],  # list of lines, each a list of (text, font_path)
+    max_font_size: int = 50,
+    glow_radii: tuple[int, int, int] = (20, 40, 80),
+    v_pad: int = 8,  # vertical padding between lines
+) -> BytesIO:
+    combined, _, _ = _render_multiline_glow(
+        template_path, lines, max_font_size, glow_radii, v_pad
+    )
     buf = BytesIO()
     combined.save(buf, "PNG")
     buf.seek(0)
     return buf
 
 
+def make_multiline_glow_base(
+    template_path: str,
+    lines: list[Line],
+    max_font_size: int = 50,
+    glow_radii: tuple[int, int, int] = (20, 40, 80),
+    v_pad: int = 8,
+) -> GlowBase:
+    """
+    Render the static lines of a banner once. Lines whose text is empty keep
+    their height in the layout so they can be filled in later with `draw_line_on_base`.
+    """
+    combined, chosen, line_tops = _render_multiline_glow(
+        template_path, lines, max_font_size, glow_radii, v_pad
+    )
+    buf = BytesIO()
+    combined.save(buf, "PNG")
+    return GlowBase(png=buf.getvalue(), font_size=chosen, line_tops=tuple(line_tops))
+
+
+def draw_line_on_base(
+    base: GlowBase,
+    line_index: int,
+    segments: Line,
+    *,
+    max_width_ratio: float = 0.8,
+) -> BytesIO:
+    """Draw one centered line (no glow) into a reserved row of a pre-rendered base."""
+    img = Image.open(BytesIO(base.png)).convert("RGBA")
+    w = img.width
+    draw = ImageDraw.Draw(img)
+
+    size = base.font_size
+    while True:
+        fonts = [get_font(str(fp), size) for _, fp in segments]
+        widths = [draw.textlength(txt, font=f) for (txt, _), f in zip(segments, fonts)]
+        if sum(widths) <= w * max_width_ratio or size <= 8:
+            break
+        size -= 2
+
+    _draw_lines(
+        draw,
+        w,
+        [segments],
+        fonts_list=[fonts],
+        widths_list=[widths],
+        line_tops=[base.line_tops[line_index]],
+        fill=TEXT_COLOR,
+    )
+
+    buf = BytesIO()
+    img.save(buf, "PNG")
+    buf.seek(0)
+    return buf
+
+
 # pylint: disable=too-many-locals#
 def make_glow_image(template_path: str, *, prefix: str, suffix: str) -> BytesIO:
     base = Image.open(template_path).convert("RGBA")
@@ -330,7 +553,7 @@ def make_glow_image_segments(
     w, h = base.size
     # Preload fonts and measure widths
     dummy = ImageDraw.Draw(base)
-    fonts = [ImageFont.truetype(str(fp), font_size) for _, fp in segments]
+    fonts = [get_font(str(fp), font_size) for _, fp in segments]
     widths = [dummy.textlength(txt, font=f) for (txt, _), f in zip(segments, fonts)]
     total_w = sum(widths)
     # Center horizontally, and vertically middle
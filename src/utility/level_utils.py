@@ -1,21 +1,34 @@
 # level_utils.py
+from bisect import bisect_right
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 import os
 import discord
-from dotenv import load_dotenv
 
-load_dotenv()
+from utility.env_utils import load_env
+
+load_env()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class XpResult:
     leveled_up: bool
     new_level: int
     old_level: int
 
 
+@dataclass(slots=True, frozen=True)
+class LevelupBannerJob:
+    """A queued level-up banner render for the announce workers."""
+
+    channel: discord.abc.Messageable
+    display_name: str
+    role_id: int
+    role_name: str
+
+
 @dataclass(slots=True, frozen=True)
 class XPStatus:
     total_xp: int
@@ -26,7 +39,7 @@ class XPStatus:
     xp_to_next: int
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True, frozen=True)
 class RankCardData:
     """A container for all data needed to generate a rank card."""
 
@@ -46,14 +59,24 @@ def build_public_storage_url(bucket: str, path: str) -> str:
     return f"{base}/storage/v1/object/public/{bucket}/{path.lstrip('/')}"
 
 
+@lru_cache(maxsize=4096)
 def xp_for_level(level: int) -> int:
     if level <= 0:
         return 0
-    return int(100 * (level**1.30))  # adjust xp gain rate here
+    # adjust xp gain rate here, and in sql/rpc/level_from_xp.sql to match
+    return int(100 * (level**1.30))
+
+
+# XP needed for levels 0..LEVEL_TABLE_SIZE, so level_from_xp is a binary search
+LEVEL_TABLE_SIZE = 1000
+_LEVEL_XP = [xp_for_level(lvl) for lvl in range(LEVEL_TABLE_SIZE + 1)]
 
 
 def level_from_xp(xp: int) -> int:
-    lvl = 0
+    if xp < _LEVEL_XP[-1]:
+        return max(0, bisect_right(_LEVEL_XP, xp) - 1)
+    # beyond the table: walk on from its last level
+    lvl = LEVEL_TABLE_SIZE
     while xp >= xp_for_level(lvl + 1):
         lvl += 1
     return lvl
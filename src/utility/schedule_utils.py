@@ -1,9 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from typing import Optional, Tuple
 
 
 # pylint: disable=too-many-instance-attributes
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True)
 class PingSchedule:
     role_id: int
     ch_id: int
@@ -13,8 +14,12 @@ class PingSchedule:
     msg: str
     delete_hour: Optional[int] = None
     delete_min: Optional[int] = None
+    # "<@&role_id> msg", built once so each ping skips the formatting
+    ping_text: str = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
+        object.__setattr__(self, "ping_text", f"<@&{self.role_id}> {self.msg}")
+
         # normalize days to an immutable tuple
         days_tuple: Tuple[int, ...] = tuple(self.days)
         object.__setattr__(self, "days", days_tuple)
@@ -49,3 +54,17 @@ class PingSchedule:
                 raise ValueError(
                     f"delete_min {self.delete_min!r} out of range (0..59)."
                 )
+
+
+def next_weekly_fire(after: datetime, weekday: int, hour: int, minute: int) -> datetime:
+    """
+    Next wall-clock `weekday hour:minute` strictly after `after`, in `after`'s zone.
+
+    Arithmetic is done on the local wall clock, so a 09:00 schedule keeps firing at
+    09:00 across DST changes.
+    """
+    fire = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    fire += timedelta(days=(weekday - after.weekday()) % 7)
+    if fire <= after:
+        fire += timedelta(days=7)
+    return fire
@@ -1,7 +1,7 @@
 # src/views/giveaway_view.py
 from typing import TYPE_CHECKING
 import discord
-from data import database as db
+from data import giveaways as db
 
 
 if TYPE_CHECKING:
@@ -1,20 +1,41 @@
 import discord
+from data import database
+from helpers.logging_helper import get_logger
+
+log = get_logger("leveling.leaderboard")
+
+# rows per leaderboard page; the command's first fetch and the view's paging agree
+LEADERBOARD_PAGE_SIZE = 10
 
 
 class LeaderboardView(discord.ui.View):
-    def __init__(self, interaction: discord.Interaction, all_rows: list):
+    def __init__(
+        self, interaction: discord.Interaction, first_page: list, total_rows: int
+    ):
         super().__init__(timeout=180.0)
         self.interaction = interaction
-        self.all_rows = all_rows
         self.current_page = 0
-        self.per_page = 10
-        self.total_pages = max(0, (len(self.all_rows) - 1) // self.per_page)
+        self.per_page = LEADERBOARD_PAGE_SIZE
+        self.total_pages = max(0, (total_rows - 1) // self.per_page)
+        self.pages: dict[int, list] = {0: first_page}  # pages already fetched
         self.message = None
 
+    async def load_page(self, page: int) -> list:
+        """Fetch a page on first visit; later visits reuse the cached rows."""
+        if page not in self.pages:
+            # the page count is known from the first fetch; skip re-counting
+            rows, _total = await database.get_leaderboard_page(
+                self.interaction.guild.id,
+                page * self.per_page,
+                self.per_page,
+                with_count=False,
+            )
+            self.pages[page] = rows
+        return self.pages[page]
+
     async def generate_embed(self) -> discord.Embed:
         start_index = self.current_page * self.per_page
-        end_index = start_index + self.per_page
-        page_rows = self.all_rows[start_index:end_index]
+        page_rows = await self.load_page(self.current_page)
 
         embed = discord.Embed(title="🏆 Server Leaderboard", color=discord.Color.gold())
         embed.set_footer(text=f"Page {self.current_page + 1}/{self.total_pages + 1}")
@@ -37,41 +58,46 @@ class LeaderboardView(discord.ui.View):
         self.children[2].disabled = self.current_page >= self.total_pages
         self.children[3].disabled = self.current_page >= self.total_pages
 
+    async def _show_page(self, interaction: discord.Interaction, page: int):
+        # ack first: an uncached page is a DB round trip that can outlast 3s
+        await interaction.response.defer()
+        previous = self.current_page
+        self.current_page = page
+        try:
+            embed = await self.generate_embed()
+        except Exception:
+            log.exception("Failed to load leaderboard page %s", page + 1)
+            self.current_page = previous
+            await interaction.followup.send(
+                "Couldn't load that page, please try again.", ephemeral=True
+            )
+            return
+        self.update_buttons()
+        await interaction.edit_original_response(embed=embed, view=self)
+
     @discord.ui.button(label="«", style=discord.ButtonStyle.secondary)
     async def first_button(
         self, interaction: discord.Interaction, _: discord.ui.Button
     ):
         if self.current_page > 0:
-            self.current_page = 0
-            self.update_buttons()
-            embed = await self.generate_embed()
-            await interaction.response.edit_message(embed=embed, view=self)
+            await self._show_page(interaction, 0)
 
     @discord.ui.button(label="←", style=discord.ButtonStyle.secondary)
     async def previous_button(
         self, interaction: discord.Interaction, _: discord.ui.Button
     ):
         if self.current_page > 0:
-            self.current_page -= 1
-            self.update_buttons()
-            embed = await self.generate_embed()
-            await interaction.response.edit_message(embed=embed, view=self)
+            await self._show_page(interaction, self.current_page - 1)
 
     @discord.ui.button(label="→", style=discord.ButtonStyle.primary)
     async def next_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         if self.current_page < self.total_pages:
-            self.current_page += 1
-            self.update_buttons()
-            embed = await self.generate_embed()
-            await interaction.response.edit_message(embed=embed, view=self)
+            await self._show_page(interaction, self.current_page + 1)
 
     @discord.ui.button(label="»", style=discord.ButtonStyle.primary)
     async def last_button(self, interaction: discord.Interaction, _: discord.ui.Button):
         if self.current_page < self.total_pages:
-            self.current_page = self.total_pages
-            self.update_buttons()
-            embed = await self.generate_embed()
-            await interaction.response.edit_message(embed=embed, view=self)
+            await self._show_page(interaction, self.total_pages)
 
     async def on_timeout(self):
         if self.message:
@@ -0,0 +1,50 @@
+# tests/test_cache_utils.py
+import pytest
+
+from utility.cache_utils import TTLCache
+
+
+def test_get_set_roundtrip():
+    c = TTLCache(maxsize=2)
+    c.set("a", 1)
+    assert c.get("a") == 1
+    assert "a" in c
+    assert c.get("missing", "dflt") == "dflt"
+
+
+def test_lru_eviction_keeps_recently_used():
+    c = TTLCache(maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")  # touch a → b becomes least recently used
+    c.set("c", 3)
+    assert "b" not in c
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert len(c) == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utility.cache_utils.time.monotonic", lambda: now[0])
+    c = TTLCache(maxsize=4, ttl=60)
+    c.set("k", b"png")
+    now[0] += 59
+    assert c.get("k") == b"png"
+    now[0] += 2
+    assert c.get("k") is None
+    assert len(c) == 0
+
+
+def test_pop_and_clear():
+    c = TTLCache(maxsize=4)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.pop("a") == 1
+    assert c.pop("a", "gone") == "gone"
+    c.clear()
+    assert len(c) == 0
+
+
+def test_maxsize_must_be_positive():
+    with pytest.raises(ValueError):
+        TTLCache(maxsize=0)
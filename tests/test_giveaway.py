@@ -366,6 +366,25 @@ async def test_process_ended_giveaway_short_circuit_when_already_ended(
     channel.fetch_message.assert_not_awaited()
 
 
+@pytest.mark.asyncio
+async def test_process_ended_giveaway_keeps_active_when_entries_fail(
+    monkeypatch, bot, giveaway_row
+):
+    from cogs.giveaway import Giveaway
+
+    cog = Giveaway(bot)
+    monkeypatch.setattr(
+        "cogs.giveaway.db.flush_entries", AsyncMock(side_effect=RuntimeError)
+    )
+    end = AsyncMock(return_value=True)
+    monkeypatch.setattr("cogs.giveaway.db.end_giveaway", end)
+
+    await cog.process_ended_giveaway(giveaway_row)
+
+    # not flipped, so the next loop tick retries with the full entrant list
+    end.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 async def test_process_ended_giveaway_no_entrants_updates_embed(
     monkeypatch, bot, channel, guild, sent_message, giveaway_row
@@ -449,6 +468,142 @@ async def test_process_ended_giveaway_picks_winners(
     sent_message.reply.assert_awaited()
 
 
+@pytest.mark.asyncio
+async def test_pick_winners_is_distinct_and_skips_zero_weight(bot):
+    from cogs.giveaway import Giveaway
+
+    cog = Giveaway(bot)
+    entrants = ["a", "b", "c", "d"]
+    winners = cog._pick_winners(entrants, [1, 0, 5, 2], k=10)
+
+    assert sorted(winners) == ["a", "c", "d"]
+
+
+@pytest.mark.asyncio
+async def test_weights_for_takes_highest_role_weight(bot, monkeypatch):
+    from cogs.giveaway import Giveaway, config
+
+    monkeypatch.setattr(config, "DEFAULT_WEIGHT", 1, raising=False)
+    monkeypatch.setattr(config, "ROLE_WEIGHTS", {10: 3, 11: 5}, raising=False)
+    cog = Giveaway(bot)
+    plain = MagicMock(roles=[])
+    vip = MagicMock(roles=[MagicMock(id=10), MagicMock(id=11), MagicMock(id=99)])
+
+    assert cog._weights_for([plain, vip]) == [1, 5]
+
+
+# -------- Tests for batched entries --------
+
+
+@pytest.fixture
+def entry_db(monkeypatch):
+    from data import giveaways as db
+
+    monkeypatch.setattr(db, "_ENTRANTS", {})
+    monkeypatch.setattr(db, "_PENDING_ENTRIES", [])
+    monkeypatch.setattr(db, "_QUEUED_ENTRANTS", set())
+    monkeypatch.setattr(db, "_ENTRY_FLUSHES", set())
+    monkeypatch.setattr(db, "ENTRY_FLUSH_DELAY", 0)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_add_entry_batches_a_burst_and_reports_the_write(entry_db, monkeypatch):
+    import asyncio
+
+    write = AsyncMock()
+    monkeypatch.setattr(entry_db, "_db_authed_async", write)
+    entry_db._ENTRANTS[42] = set()
+
+    results = await asyncio.gather(
+        entry_db.add_entry(42, 1),
+        entry_db.add_entry(42, 2),
+        entry_db.add_entry(42, 1),
+    )
+
+    assert [ok for ok, _ in results] == [True, True, False]
+    write.assert_awaited_once()  # one insert for the whole burst
+    assert entry_db._ENTRANTS[42] == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_add_entry_reports_a_failed_write(entry_db, monkeypatch):
+    monkeypatch.setattr(
+        entry_db, "_db_authed_async", AsyncMock(side_effect=RuntimeError("down"))
+    )
+    entry_db._ENTRANTS[42] = set()
+
+    ok, note = await entry_db.add_entry(42, 1)
+
+    assert ok is False and "error" in note
+    # forgotten, so pressing the button again retries the entry
+    assert entry_db._ENTRANTS[42] == set()
+    assert not entry_db._QUEUED_ENTRANTS
+
+
+@pytest.mark.asyncio
+async def test_entry_count_skips_entries_not_yet_written(entry_db, monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(entry_db, "_db_authed_async", AsyncMock())
+    monkeypatch.setattr(entry_db, "ENTRY_FLUSH_DELAY", 60)
+    entry_db._ENTRANTS[42] = {1}
+
+    entry = asyncio.create_task(entry_db.add_entry(42, 2))
+    await asyncio.sleep(0)  # queued, batch not yet due
+
+    assert await entry_db.get_entry_count(42) == 1
+    # still a duplicate while queued
+    assert (await entry_db.add_entry(42, 2))[0] is False
+
+    await entry_db.flush_entries()
+    assert await entry == (True, "You have entered the giveaway!")
+    assert await entry_db.get_entry_count(42) == 2
+    for flush in entry_db._ENTRY_FLUSHES:
+        flush.cancel()
+
+
+@pytest.mark.asyncio
+async def test_entrants_are_not_read_when_queued_entries_fail(entry_db, monkeypatch):
+    import asyncio
+
+    write = AsyncMock(side_effect=RuntimeError("down"))
+    monkeypatch.setattr(entry_db, "_db_authed_async", write)
+    monkeypatch.setattr(entry_db, "ENTRY_FLUSH_DELAY", 60)
+    entry_db._ENTRANTS[42] = set()
+
+    entry = asyncio.create_task(entry_db.add_entry(42, 1))
+    await asyncio.sleep(0)  # queued, batch not yet due
+
+    with pytest.raises(RuntimeError):
+        await entry_db.get_giveaway_entrants(42)
+    write.assert_awaited_once()  # the SELECT never ran
+
+    assert (await entry) == (False, "An error occurred while entering the giveaway.")
+    for flush in entry_db._ENTRY_FLUSHES:
+        flush.cancel()
+
+
+@pytest.mark.asyncio
+async def test_entry_count_comes_from_entrant_set_once_known(entry_db, monkeypatch):
+    write = AsyncMock()
+    monkeypatch.setattr(entry_db, "_db_authed_async", write)
+    entry_db._ENTRANTS[42] = {1, 2, 3}
+
+    assert await entry_db.get_entry_count(42) == 3
+    write.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_entry_count_falls_back_to_exact_db_count(entry_db, monkeypatch):
+    count = AsyncMock(return_value=MagicMock(count=7))
+    monkeypatch.setattr(entry_db, "_db_authed_async", count)
+
+    assert await entry_db.get_entry_count(42) == 7
+    count.assert_awaited_once()
+    assert 42 not in entry_db._ENTRANTS  # a count alone doesn't seed the set
+
+
 # -------- Loop trigger test --------
 
 
@@ -470,9 +625,8 @@ async def test_check_giveaways_loop_triggers_processing(monkeypatch, bot, giveaw
 
 
 @pytest.mark.asyncio
-async def test_process_xp_gain_happy_path_updates_db(monkeypatch):
+async def test_process_xp_gain_buffers_until_flush(monkeypatch):
     from cogs.leveling import Leveling
-    from data import database as db
 
     bot = MagicMock(spec=discord.Client)
     guild = MagicMock(spec=discord.Guild)
@@ -487,25 +641,30 @@ async def test_process_xp_gain_happy_path_updates_db(monkeypatch):
     msg.guild = guild
     msg.channel = channel
 
-    # mock DB calls as AsyncMock (these are awaited in the cog)
     monkeypatch.setattr(
         "cogs.leveling.database.get_user", AsyncMock(return_value=(0, 0))
     )
-    su = AsyncMock()
-    inc = AsyncMock()
-    monkeypatch.setattr("cogs.leveling.database.set_user_xp_and_level", su)
-    monkeypatch.setattr("cogs.leveling.database.increment_daily_xp", inc)
+    bulk = AsyncMock()
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", bulk)
 
+    monkeypatch.setattr("helpers.xp_buffer.et_today", lambda: "2024-01-01")
     cog = Leveling(bot)
-    # avoid randomness for determinism
-    monkeypatch.setattr("random.randint", lambda a, b: 5)
+    # avoid randomness for determinism; 150 XP crosses level 1
+    cog.xp_buffer.roll = lambda _r: 150
 
-    # call
     res = await cog._process_xp_gain(msg)
 
-    assert res is not None and res.new_level >= 0
-    su.assert_awaited_once()  # <- was False before
-    inc.assert_awaited_once()
+    assert res is not None and res.new_level == 1 and res.old_level == 0
+    # gains are buffered, nothing is written per message
+    bulk.assert_not_awaited()
+    assert cog.xp_buffer.pending == {(1, 99, "2024-01-01"): 150}
+
+    await cog.xp_buffer.flush()
+
+    bulk.assert_awaited_once()
+    (rows,), _ = bulk.await_args
+    assert rows == [{"guild_id": 1, "user_id": 99, "delta": 150, "day": "2024-01-01"}]
+    assert cog.xp_buffer.pending == {}
 
 
 @pytest.mark.asyncio
@@ -525,20 +684,22 @@ async def test_process_xp_gain_respects_cooldown(monkeypatch):
     msg.guild = guild
     msg.channel = channel
 
-    # DB reads/writes
-    monkeypatch.setattr(
-        "cogs.leveling.database.get_user", AsyncMock(return_value=(0, 0))
-    )
-    monkeypatch.setattr("cogs.leveling.database.set_user_xp_and_level", AsyncMock())
-    monkeypatch.setattr("cogs.leveling.database.increment_daily_xp", AsyncMock())
+    get_user = AsyncMock(return_value=(0, 0))
+    monkeypatch.setattr("cogs.leveling.database.get_user", get_user)
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", AsyncMock())
+    monkeypatch.setattr("helpers.xp_buffer.et_today", lambda: "2024-01-01")
 
     cog = Leveling(bot)
+    cog.xp_buffer.roll = lambda _r: 5
     cog.guild_cooldowns[guild.id] = 60  # 60s cooldown
 
-    # first call awards XP
+    # first call buffers XP (no level-up at 5 XP)
     r1 = await cog._process_xp_gain(msg)
-    assert r1 is not None
+    assert r1 is None
+    assert cog.xp_buffer.pending == {(1, 99, "2024-01-01"): 5}
 
-    # second call immediately should be skipped
-    r2 = await cog._process_xp_gain(msg)  # <- you weren’t awaiting this
+    # second call immediately is skipped by the cooldown
+    r2 = await cog._process_xp_gain(msg)
     assert r2 is None
+    assert cog.xp_buffer.pending == {(1, 99, "2024-01-01"): 5}
+    get_user.assert_awaited_once()
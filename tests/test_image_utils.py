@@ -0,0 +1,29 @@
+# tests/test_image_utils.py
+from io import BytesIO
+
+from PIL import Image
+
+from utility.image_utils import process_banner_bytes
+
+
+def _png(size, color) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_darken_overlay_keeps_hue_and_opacity():
+    raw = _png((64, 32), (250, 124, 62))
+
+    out, mime, ext = process_banner_bytes(
+        raw, target_size=(32, 16), darken_overlay_rgba=(0, 0, 0, 128)
+    )
+
+    assert (mime, ext) == ("image/webp", "webp")
+    img = Image.open(BytesIO(out)).convert("RGBA")
+    assert img.size == (32, 16)
+    r, g, b, a = img.getpixel((16, 8))
+    # composited over the banner: about half as bright, same colour, still opaque
+    assert a == 255
+    assert max(abs(r - 125), abs(g - 62), abs(b - 31)) <= 2
+    assert r > g > b > 0
@@ -1,8 +1,10 @@
 # tests/test_leveling.py
+import asyncio
+import dataclasses
 from datetime import datetime, timedelta, timezone
 from io import BytesIO
 from zoneinfo import ZoneInfo
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 import types
 import pytest
 import discord
@@ -10,6 +12,8 @@ import discord
 from cogs.leveling import Leveling
 from utility.level_utils import XpResult
 
+DAY = "2024-01-01"  # ET date buffered gains are stamped with
+
 
 @pytest.fixture
 def bot():
@@ -39,9 +43,32 @@ def cog(bot, monkeypatch):
     monkeypatch.setattr(config, "DAILY_XP_ROLE", 3333, False)
     # map guild id -> announce channel id
     monkeypatch.setattr(config, "DAILY_ANNOUNCE_CHANNEL", {1234: 4444}, False)
+    monkeypatch.setattr("helpers.xp_buffer.et_today", lambda: DAY)
     return Leveling(bot)
 
 
+# ---------- on_ready ----------
+@pytest.mark.asyncio
+async def test_on_ready_loads_settings_with_one_query(cog, monkeypatch):
+    dump = AsyncMock(
+        return_value={
+            1: {"xp_cooldown": 30, "min_xp": 5, "max_xp": 9, "levelup_channel_id": 77},
+            2: {"xp_cooldown": None, "min_xp": None, "max_xp": None},
+        }
+    )
+    monkeypatch.setattr("cogs.leveling.database.get_all_guild_settings", dump)
+    monkeypatch.setattr(
+        "cogs.leveling.database.daily_xp_exists", AsyncMock(return_value=False)
+    )
+
+    await cog.on_ready()
+
+    dump.assert_awaited_once()
+    assert cog.guild_cooldowns == {1: 30}
+    assert cog.guild_xp_ranges == {1: (5, 9)}
+    assert cog.guild_levelup_channels == {1: 77}
+
+
 # ---------- _process_xp_gain ----------
 @pytest.mark.asyncio
 async def test_process_xp_gain_respects_cooldown(cog, monkeypatch):
@@ -52,13 +79,36 @@ async def test_process_xp_gain_respects_cooldown(cog, monkeypatch):
     msg.channel.id = 999
 
     cog.guild_cooldowns[msg.guild.id] = 10
-    cog._last_xp[(msg.guild.id, msg.author.id)] = 1000.0
-    monkeypatch.setattr("time.time", lambda: 1005.0)
+    cog._cooldown_until[(msg.guild.id, msg.author.id)] = 1010.0
+    monkeypatch.setattr(
+        "cogs.leveling.time", types.SimpleNamespace(monotonic=lambda: 1005.0)
+    )
 
     res = await cog._process_xp_gain(msg)  # ← await
     assert res is None
 
 
+@pytest.mark.asyncio
+async def test_prune_cooldowns_drops_expired(cog, monkeypatch):
+    cog._cooldown_until = {(1, 1): 900.0, (1, 2): 1100.0}
+    monkeypatch.setattr(
+        "cogs.leveling.time", types.SimpleNamespace(monotonic=lambda: 1000.0)
+    )
+
+    await cog.prune_cooldowns.coro(cog)
+
+    assert cog._cooldown_until == {(1, 2): 1100.0}
+
+
+def test_roll_xp_draws_from_pool_per_range(cog):
+    gains = [cog.xp_buffer.roll((3, 7)) for _ in range(50)]
+    assert all(3 <= g <= 7 for g in gains)
+    assert cog.xp_buffer._pools[(3, 7)][1] == 50
+
+    # a changed range gets a fresh pool
+    assert cog.xp_buffer.roll((9, 9)) == 9
+
+
 @pytest.mark.asyncio
 async def test_process_xp_gain_happy_path_updates_db(cog, monkeypatch):
     msg = MagicMock(spec=discord.Message)
@@ -70,22 +120,187 @@ async def test_process_xp_gain_happy_path_updates_db(cog, monkeypatch):
     cog.guild_cooldowns[msg.guild.id] = 0
     cog.guild_xp_ranges[msg.guild.id] = (5, 5)
 
-    monkeypatch.setattr("time.time", lambda: 1000.0)
+    monkeypatch.setattr(
+        "cogs.leveling.time", types.SimpleNamespace(monotonic=lambda: 1000.0)
+    )
     monkeypatch.setattr("random.randint", lambda a, b: 5)
 
     # ← patch the *same path used by the cog* and use AsyncMock
+    get_user = AsyncMock(return_value=(10, 0))
+    bulk = AsyncMock()
+    monkeypatch.setattr("cogs.leveling.database.get_user", get_user)
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", bulk)
+
+    res = await cog._process_xp_gain(msg)  # ← await
+    assert res is None  # XP buffered, but no level-up to report
+    get_user.assert_awaited_once_with(55, 777)
+    bulk.assert_not_awaited()  # nothing is written on the message path
+    assert cog.xp_buffer.pending == {(777, 55, DAY): 5}
+
+    await cog.xp_buffer.flush()
+    bulk.assert_awaited_once_with(
+        [{"guild_id": 777, "user_id": 55, "delta": 5, "day": DAY}],
+        batch_id=ANY,
+    )
+    assert cog.xp_buffer.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_process_xp_gain_uses_running_total_for_level_up(cog, monkeypatch):
+    msg = MagicMock(spec=discord.Message)
+    msg.author.id = 55
+    msg.guild.id = 777
+
+    cog.guild_cooldowns[msg.guild.id] = 0
+    cog.guild_xp_ranges[msg.guild.id] = (5, 5)
+    monkeypatch.setattr(
+        "cogs.leveling.time", types.SimpleNamespace(monotonic=lambda: 1000.0)
+    )
+    monkeypatch.setattr("random.randint", lambda a, b: 5)
+
+    get_user = AsyncMock()
+    monkeypatch.setattr("cogs.leveling.database.get_user", get_user)
+
+    # 97 -> 102 crosses the level-1 threshold (100 XP); no DB read needed
+    cog.xp_buffer.totals.set((777, 55), 97)
+    res = await cog._process_xp_gain(msg)
+    assert res.leveled_up and res.new_level == 1
+    get_user.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_schedules_a_single_early_flush(cog, monkeypatch):
+    monkeypatch.setattr("helpers.xp_buffer.XP_FLUSH_MAX_PENDING", 1)
+    monkeypatch.setattr(
+        "cogs.leveling.time", types.SimpleNamespace(monotonic=lambda: 1000.0)
+    )
     monkeypatch.setattr(
-        "cogs.leveling.database.get_user", AsyncMock(return_value=(10, 1))
+        "cogs.leveling.database.get_user", AsyncMock(return_value=(0, 0))
     )
-    set_user = AsyncMock()
-    inc_daily = AsyncMock()
-    monkeypatch.setattr("cogs.leveling.database.set_user_xp_and_level", set_user)
-    monkeypatch.setattr("cogs.leveling.database.increment_daily_xp", inc_daily)
+    bulk = AsyncMock()
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", bulk)
+    cog.guild_cooldowns[777] = 0
+    cog.guild_xp_ranges[777] = (5, 5)
 
-    res = await cog._process_xp_gain(msg)  # ← await
-    assert res is not None
-    set_user.assert_awaited_once()
-    inc_daily.assert_awaited_once()
+    for user_id in (1, 2):
+        msg = MagicMock(spec=discord.Message)
+        msg.author.id = user_id
+        msg.guild.id = 777
+        await cog._process_xp_gain(msg)
+
+    await cog.xp_buffer.early_flush
+    bulk.assert_awaited_once()
+    assert len(bulk.await_args.args[0]) == 2
+
+
+@pytest.mark.asyncio
+async def test_flush_xp_failure_resends_same_batch(cog, monkeypatch):
+    cog.xp_buffer.pending = {(1, 2, DAY): 7}
+    cog.xp_buffer.totals.set((1, 2), 50)
+    bulk = AsyncMock(side_effect=[asyncio.TimeoutError, None, None])
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", bulk)
+
+    await cog.xp_buffer.flush()
+
+    # the failed batch is held back as-is, not merged into newer gains
+    assert cog.xp_buffer.pending == {}
+    assert cog.xp_buffer.unflushed((1, 2)) == 7
+    first_id = bulk.await_args.kwargs["batch_id"]
+
+    cog.xp_buffer.pending = {(1, 2, DAY): 3}
+    await cog.xp_buffer.flush()
+
+    assert bulk.await_count == 3
+    retry, fresh = bulk.await_args_list[1], bulk.await_args_list[2]
+    assert retry.kwargs["batch_id"] == first_id
+    assert retry.args[0][0]["delta"] == 7
+    assert fresh.kwargs["batch_id"] != first_id
+    assert fresh.args[0][0]["delta"] == 3
+    assert cog.xp_buffer.batch is None and cog.xp_buffer.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_backs_off_early_flushes(cog, monkeypatch):
+    monkeypatch.setattr("helpers.xp_buffer.XP_FLUSH_MAX_PENDING", 1)
+    clock = types.SimpleNamespace(monotonic=lambda: 1000.0)
+    monkeypatch.setattr("cogs.leveling.time", clock)
+    monkeypatch.setattr("helpers.xp_buffer.time", clock)
+    monkeypatch.setattr(
+        "cogs.leveling.database.get_user", AsyncMock(return_value=(0, 0))
+    )
+    bulk = AsyncMock(side_effect=RuntimeError)
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", bulk)
+    cog.guild_cooldowns[777] = 0
+    cog.guild_xp_ranges[777] = (5, 5)
+
+    cog.xp_buffer.pending = {(1, 2, DAY): 7}
+    await cog.xp_buffer.flush()
+    assert cog.xp_buffer.retry_at > 1000.0
+
+    for user_id in (1, 2, 3):
+        msg = MagicMock(spec=discord.Message)
+        msg.author.id = user_id
+        msg.guild.id = 777
+        await cog._process_xp_gain(msg)
+
+    # a full buffer does not start a new failing flush per message while backing off
+    assert cog.xp_buffer.early_flush is None
+    await cog.flush_xp.coro(cog)
+    bulk.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_gains_keep_the_day_they_were_earned(cog, monkeypatch):
+    monkeypatch.setattr(
+        "cogs.leveling.database.get_user", AsyncMock(return_value=(0, 0))
+    )
+    bulk = AsyncMock()
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", bulk)
+
+    await cog.xp_buffer.add((1, 2), 5)
+    # midnight ET passes before the flush
+    monkeypatch.setattr("helpers.xp_buffer.et_today", lambda: "2024-01-02")
+    await cog.xp_buffer.add((1, 2), 3)
+    assert cog.xp_buffer.unflushed((1, 2)) == 8
+
+    await cog.xp_buffer.flush()
+
+    (rows,), _ = bulk.await_args
+    assert sorted((r["day"], r["delta"]) for r in rows) == [
+        (DAY, 5),
+        ("2024-01-02", 3),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_seed_rereads_when_a_flush_lands_mid_read(cog, monkeypatch):
+    stored = {"xp": 0}
+
+    async def bulk(rows, *, batch_id):
+        stored["xp"] += sum(r["delta"] for r in rows)
+
+    async def get_user(user_id, guild_id):
+        seen = stored["xp"]
+        if get_user_mock.await_count == 1:
+            # the flush commits after this read saw the row, before it returns
+            await cog.xp_buffer.flush()
+        return (seen, 0)
+
+    get_user_mock = AsyncMock(side_effect=get_user)
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", bulk)
+    monkeypatch.setattr("cogs.leveling.database.get_user", get_user_mock)
+    cog.xp_buffer.pending = {(1, 2, DAY): 7}
+
+    # the stale read (0 XP, nothing left unflushed) would drop the flushed 7
+    assert await cog.xp_buffer.add((1, 2), 5) == (7, 12)
+    assert get_user_mock.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_forget_forces_reseed(cog):
+    cog.xp_buffer.totals.set((1, 2), 50)
+    cog.xp_buffer.forget((1, 2))
+    assert cog.xp_buffer.totals.get((1, 2)) is None
 
 
 # ---------- on_message ----------
@@ -112,7 +327,7 @@ async def test_on_message_ignores_bots_or_no_guild_or_excluded(cog, monkeypatch)
     m3.author.bot = False
     m3.guild = MagicMock()
     m3.channel.id = 123
-    config.EXCLUDED_CHANNELS = {123}
+    cog._excluded_channels = frozenset({123})
 
     with patch.object(cog, "_process_xp_gain", return_value=None) as proc, patch.object(
         cog, "_announce_levelup", new_callable=AsyncMock
@@ -138,6 +353,24 @@ async def test_on_message_triggers_announce_when_leveled(cog):
         announce.assert_awaited_once_with(m, 3)
 
 
+@pytest.mark.asyncio
+async def test_on_message_skips_xp_coroutine_inside_cooldown(cog, monkeypatch):
+    m = MagicMock(spec=discord.Message)
+    m.author.bot = False
+    m.author.id = 5
+    m.guild = MagicMock()
+    m.guild.id = 7
+    m.channel.id = 1
+    cog._cooldown_until[(7, 5)] = 1010.0
+    monkeypatch.setattr(
+        "cogs.leveling.time", types.SimpleNamespace(monotonic=lambda: 1005.0)
+    )
+
+    with patch.object(cog, "_process_xp_gain") as proc:
+        await cog.on_message(m)
+        proc.assert_not_called()
+
+
 # ---------- _announce_levelup ----------
 
 
@@ -166,7 +399,7 @@ async def test_announce_levelup_no_role_reward(cog):
     msg.author.display_name = "u"
 
     # no role for this level
-    with patch.dict("cogs.leveling.config.ROLE_REWARDS", {}, clear=True):
+    with patch.dict(cog._role_rewards, {}, clear=True):
         await cog._announce_levelup(msg, 9)
         ch.send.assert_awaited_once()  # only the "leveled up" text
 
@@ -194,15 +427,58 @@ async def test_announce_levelup_full_flow(cog):
     msg.guild = guild
     msg.author = member
 
-    # image utils returns a BytesIO-like
-    with patch("cogs.leveling.image_utils.make_multiline_glow") as glow:
-        glow.return_value = MagicMock()
+    role.id = 2222
+    with patch(
+        "helpers.banner_helper.image_utils.make_multiline_glow_base"
+    ) as base, patch("helpers.banner_helper.image_utils.draw_line_on_base") as splat:
+        base.return_value = MagicMock()
+        splat.return_value = BytesIO(b"png")
 
         await cog._announce_levelup(msg, 3)
 
-        # sent the plain text + the banner
-        assert lvl_channel.send.await_count == 2
+        # text goes out immediately; the banner is queued for the workers
+        assert lvl_channel.send.await_count == 1
         member.add_roles.assert_awaited_once()
+        assert cog._levelup.queue.qsize() == 1
+
+        job = cog._levelup.queue.get_nowait()
+        await cog._levelup.send(job)
+        assert lvl_channel.send.await_count == 2
+
+        # the glow base is rendered once per role and reused afterwards
+        other = dataclasses.replace(job, display_name="Bob")
+        await cog._levelup.send(other)
+        base.assert_called_once()
+        assert splat.call_count == 2
+
+        # a repeat of the same banner is served from memory
+        await cog._levelup.send(job)
+        assert splat.call_count == 2
+        assert lvl_channel.send.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_announce_levelup_queue_full_sends_text_only(cog):
+    guild = MagicMock(spec=discord.Guild)
+    lvl_channel = MagicMock(spec=discord.TextChannel)
+    lvl_channel.send = AsyncMock()
+    guild.get_channel.return_value = lvl_channel
+    role = MagicMock(spec=discord.Role)
+    role.name = "Champion"
+    guild.get_role.return_value = role
+
+    member = MagicMock(spec=discord.Member)
+    member.display_name = "Alice"
+    member.add_roles = AsyncMock()
+    msg = MagicMock(spec=discord.Message)
+    msg.guild = guild
+    msg.author = member
+
+    with patch.object(cog._levelup.queue, "put_nowait", side_effect=asyncio.QueueFull):
+        await cog._announce_levelup(msg, 3)
+
+    assert lvl_channel.send.await_count == 2
+    assert "Champion" in lvl_channel.send.await_args.args[0]
 
 
 # ---------- /rank ----------
@@ -245,6 +521,9 @@ async def test_rank_no_data(monkeypatch):
     monkeypatch.setattr(
         "cogs.leveling.database.get_user_rank", AsyncMock(return_value=None)
     )
+    monkeypatch.setattr(
+        "cogs.leveling.database.get_user_profile", AsyncMock(return_value=None)
+    )
 
     cog = Leveling(MagicMock())
     await cog.rank.callback(cog, interaction)  # ← use .callback
@@ -286,15 +565,18 @@ async def test_rank_happy_path(monkeypatch):
     monkeypatch.setattr(
         "cogs.leveling.fetch_banner_bytes", AsyncMock(return_value=None)
     )
-    fake = discord.File(fp=BytesIO(b"img"), filename="rank.png")
-    monkeypatch.setattr(
-        "cogs.leveling.banner_helper.generate_rank_card", AsyncMock(return_value=fake)
-    )
+    render = AsyncMock(return_value=b"img")
+    monkeypatch.setattr("cogs.leveling.banner_helper.render_rank_card", render)
 
     cog = Leveling(MagicMock())
     await cog.rank.callback(cog, interaction)  # ← use .callback
 
     interaction.followup.send.assert_awaited()
+    assert isinstance(interaction.followup.send.await_args.kwargs["file"], discord.File)
+
+    # a second call inside the TTL is served from the card cache
+    await cog.rank.callback(cog, interaction)
+    render.assert_awaited_once()
 
 
 # ---------- /leaderboard ----------
@@ -313,7 +595,7 @@ async def test_leaderboard_empty(monkeypatch):
     interaction.followup.send = AsyncMock()
 
     monkeypatch.setattr(
-        "cogs.leveling.database.get_leaderboard", AsyncMock(return_value=[])
+        "cogs.leveling.database.get_leaderboard_page", AsyncMock(return_value=([], 0))
     )
 
     cog = Leveling(MagicMock())
@@ -336,9 +618,8 @@ async def test_leaderboard_happy_path(monkeypatch):
     interaction.followup.send = AsyncMock()
 
     rows = [(111, 5, 1234), (222, 4, 900)]
-    monkeypatch.setattr(
-        "cogs.leveling.database.get_leaderboard", AsyncMock(return_value=rows)
-    )
+    page = AsyncMock(return_value=(rows, 2))
+    monkeypatch.setattr("cogs.leveling.database.get_leaderboard_page", page)
 
     class DummyView:
         def __init__(self, *_):
@@ -353,8 +634,53 @@ async def test_leaderboard_happy_path(monkeypatch):
     with patch("cogs.leveling.LeaderboardView", DummyView):
         cog = Leveling(MagicMock())
         await cog.leaderboard.callback(cog, interaction)  # ← use .callback
+        # a second call inside the TTL reuses the cached first page
+        await cog.leaderboard.callback(cog, interaction)
 
-    interaction.followup.send.assert_awaited()
+    assert interaction.followup.send.await_count == 2
+    page.assert_awaited_once_with(1, 0, 10)  # only the first page is fetched
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_view_defers_before_loading_page(monkeypatch):
+    from views.leaderboard_view import LeaderboardView
+
+    interaction = MagicMock()
+    interaction.guild.id = 1
+    interaction.response.defer = AsyncMock()
+    interaction.edit_original_response = AsyncMock()
+    page = AsyncMock(return_value=([(3, 1, 120)], None))
+    monkeypatch.setattr("views.leaderboard_view.database.get_leaderboard_page", page)
+
+    view = LeaderboardView(interaction, [(1, 2, 300)], 11)
+    await view._show_page(interaction, 1)
+
+    interaction.response.defer.assert_awaited_once()
+    page.assert_awaited_once_with(1, 10, 10, with_count=False)
+    interaction.edit_original_response.assert_awaited_once()
+    assert view.current_page == 1
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_view_page_error_keeps_current_page(monkeypatch):
+    from views.leaderboard_view import LeaderboardView
+
+    interaction = MagicMock()
+    interaction.guild.id = 1
+    interaction.response.defer = AsyncMock()
+    interaction.edit_original_response = AsyncMock()
+    interaction.followup.send = AsyncMock()
+    monkeypatch.setattr(
+        "views.leaderboard_view.database.get_leaderboard_page",
+        AsyncMock(side_effect=RuntimeError("db down")),
+    )
+
+    view = LeaderboardView(interaction, [(1, 2, 300)], 11)
+    await view._show_page(interaction, 1)
+
+    assert view.current_page == 0
+    interaction.edit_original_response.assert_not_awaited()
+    assert interaction.followup.send.await_args.kwargs["ephemeral"] is True
 
 
 # ---------- daily_award_task ----------
@@ -369,6 +695,83 @@ async def test_daily_award_stage_task_assigns_and_announces(cog):
     role = MagicMock
 
 
+@pytest.mark.asyncio
+async def test_drain_award_outbox_removes_holders_concurrently(cog, monkeypatch):
+    ok_holder = MagicMock(id=1, remove_roles=AsyncMock())
+    bad_holder = MagicMock(
+        id=2, remove_roles=AsyncMock(side_effect=discord.HTTPException(MagicMock(), ""))
+    )
+    role = MagicMock(spec=discord.Role, members=[ok_holder, bad_holder])
+    winner = MagicMock(roles=[], add_roles=AsyncMock())
+    channel = MagicMock(spec=discord.TextChannel)
+    channel.send = AsyncMock(return_value=MagicMock(id=555))
+
+    guild = MagicMock(spec=discord.Guild)
+    guild.get_role.return_value = role
+    guild.get_member.return_value = winner
+    guild.get_channel.return_value = channel
+    cog.bot.get_guild.return_value = guild
+
+    row = {
+        "guild_id": 1234,
+        "target_date": "2024-01-01",
+        "user_id": 7,
+        "xp_gain": 50,
+        "payload": {"channel_id": 4444},
+    }
+    monkeypatch.setattr(
+        "cogs.leveling.database.list_outbox_pending", AsyncMock(return_value=[row])
+    )
+    marked = AsyncMock()
+    monkeypatch.setattr("cogs.leveling.database.mark_awards_announced", marked)
+
+    await cog._drain_award_outbox_once()
+
+    ok_holder.remove_roles.assert_awaited_once()
+    bad_holder.remove_roles.assert_awaited_once()
+    winner.add_roles.assert_awaited_once()
+    marked.assert_awaited_once_with(
+        [{"guild_id": 1234, "target_date": "2024-01-01", "message_id": 555}]
+    )
+
+
+@pytest.mark.asyncio
+async def test_stage_awards_claims_all_guilds_in_one_call(cog, monkeypatch):
+    cog.bot.guilds = [MagicMock(id=1234), MagicMock(id=2)]
+
+    claim = AsyncMock(return_value={1234: (10, 100)})
+    monkeypatch.setattr("cogs.leveling.database.claim_daily_awards", claim)
+
+    bulk = AsyncMock()
+    monkeypatch.setattr("cogs.leveling.database.bulk_add_xp", bulk)
+    cog.xp_buffer.pending = {(1234, 10, DAY): 5}
+
+    await cog.stage_awards_for_date(DAY)
+
+    # the day's buffered XP is written before the day is settled
+    bulk.assert_awaited_once()
+    assert cog.xp_buffer.pending == {}
+    # guild 1234 has an announce channel configured by the fixture
+    claim.assert_awaited_once_with(DAY, {1234: 4444, 2: None})
+
+
+@pytest.mark.asyncio
+async def test_daily_award_targets_cached_until_delete(cog):
+    role = MagicMock(spec=discord.Role)
+    channel = MagicMock(spec=discord.TextChannel, id=4444)
+    guild = MagicMock(spec=discord.Guild, id=1234)
+    guild.get_role.return_value = role
+    guild.get_channel.return_value = channel
+
+    assert await cog._daily_award_targets(guild, 4444) == (role, channel)
+    assert await cog._daily_award_targets(guild, 4444) == (role, channel)
+    guild.get_role.assert_called_once()
+
+    await cog.on_guild_channel_delete(MagicMock(guild=guild))
+    await cog._daily_award_targets(guild, 4444)
+    assert guild.get_role.call_count == 2
+
+
 @pytest.fixture(autouse=True)
 def disable_daily_loop(monkeypatch):
     from cogs.leveling import Leveling
@@ -381,3 +784,54 @@ def disable_daily_loop(monkeypatch):
         self.daily_award_stage_task.cancel = lambda: None
 
     monkeypatch.setattr(Leveling, "__init__", wrapped)
+
+
+# ---------- /rank-set-banner ----------
+
+
+@pytest.mark.asyncio
+async def test_rank_set_banner_rejects_bad_magic_without_download(
+    cog, interaction, monkeypatch
+):
+    import config
+
+    monkeypatch.setattr(config, "ALLOWED_MIME", {"image/png"}, False)
+    monkeypatch.setattr(config, "MAX_UPLOAD_BYTES", 2_000_000, False)
+    monkeypatch.setattr(
+        "cogs.leveling.fetch_head_bytes", AsyncMock(return_value=b"MZ\x90\x00" * 4)
+    )
+
+    image = MagicMock(spec=discord.Attachment)
+    image.content_type = "image/png"
+    image.size = 1024
+    image.width, image.height = 1600, 400
+    image.url = "https://cdn.example/x.png"
+    image.read = AsyncMock()
+
+    await cog.rank_set_banner.callback(cog, interaction, image)
+
+    image.read.assert_not_awaited()
+    assert "not a valid" in interaction.followup.send.await_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_rank_set_banner_rejects_huge_dimensions(cog, interaction, monkeypatch):
+    import config
+
+    monkeypatch.setattr(config, "ALLOWED_MIME", {"image/png"}, False)
+    monkeypatch.setattr(config, "MAX_UPLOAD_BYTES", 2_000_000, False)
+    monkeypatch.setattr(config, "MAX_PIXELS", 40_000_000, False)
+    head = AsyncMock()
+    monkeypatch.setattr("cogs.leveling.fetch_head_bytes", head)
+
+    image = MagicMock(spec=discord.Attachment)
+    image.content_type = "image/png"
+    image.size = 1024
+    image.width, image.height = 20_000, 20_000
+    image.read = AsyncMock()
+
+    await cog.rank_set_banner.callback(cog, interaction, image)
+
+    head.assert_not_awaited()
+    image.read.assert_not_awaited()
+    assert "too large" in interaction.followup.send.await_args.args[0]
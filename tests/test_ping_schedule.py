@@ -1,5 +1,9 @@
+import dataclasses
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
 import pytest
-from utility.schedule_utils import PingSchedule
+from utility.schedule_utils import PingSchedule, next_weekly_fire
 
 
 def test_valid_schedule_ok():
@@ -16,6 +20,17 @@ def test_valid_schedule_ok():
     assert tuple(s.days) == (0, 2, 4)
 
 
+def test_ping_text_is_prebuilt():
+    s = PingSchedule(role_id=42, ch_id=2, ping_hour=9, ping_min=0, days=[1], msg="hi")
+    assert s.ping_text == "<@&42> hi"
+
+
+def test_schedule_is_frozen():
+    s = PingSchedule(1, 2, 9, 0, [1], "x")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        s.ping_hour = 10
+
+
 @pytest.mark.parametrize("days", [[], (), ()])
 def test_days_cannot_be_empty(days):
     with pytest.raises(ValueError, match="days cannot be empty"):
@@ -47,3 +62,23 @@ def test_delete_time_both_or_none_required():
 def test_delete_time_out_of_range(dh, dm):
     with pytest.raises(ValueError, match="delete_"):
         PingSchedule(1, 2, 9, 0, [1], "x", delete_hour=dh, delete_min=dm)
+
+
+ET = ZoneInfo("America/New_York")
+
+
+def test_next_weekly_fire_same_day_later():
+    now = datetime(2024, 5, 6, 8, 0, tzinfo=ET)  # Monday
+    assert next_weekly_fire(now, 0, 9, 30) == datetime(2024, 5, 6, 9, 30, tzinfo=ET)
+
+
+def test_next_weekly_fire_rolls_to_next_week_once_passed():
+    now = datetime(2024, 5, 6, 9, 30, tzinfo=ET)  # Monday, exactly at fire time
+    assert next_weekly_fire(now, 0, 9, 30) == datetime(2024, 5, 13, 9, 30, tzinfo=ET)
+
+
+def test_next_weekly_fire_keeps_wall_clock_across_dst():
+    now = datetime(2024, 3, 8, 12, 0, tzinfo=ET)  # Friday before spring-forward
+    fire = next_weekly_fire(now, 0, 9, 0)
+    assert (fire.month, fire.day, fire.hour, fire.minute) == (3, 11, 9, 0)
+    assert fire.utcoffset().total_seconds() == -4 * 3600
@@ -0,0 +1,162 @@
+# tests/test_scheduling.py
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import discord
+
+import config
+from cogs.scheduling import EASTERN_TIMEZONE, Scheduling
+from utility.schedule_utils import PingSchedule
+
+GUILD_ID = 555
+
+
+def _channel(ch_id: int, name: str) -> MagicMock:
+    ch = MagicMock(spec=discord.TextChannel)
+    ch.id = ch_id
+    ch.name = name
+    ch.send = AsyncMock()
+    ch.purge = AsyncMock(return_value=[])
+    return ch
+
+
+@pytest.fixture
+def channels():
+    return {}
+
+
+@pytest.fixture
+def guild(channels):
+    g = MagicMock(spec=discord.Guild)
+    g.id = GUILD_ID
+    g.get_channel.side_effect = channels.get
+    g.get_role.side_effect = lambda role_id: MagicMock(spec=discord.Role, id=role_id)
+    return g
+
+
+@pytest.fixture
+def bot(guild):
+    b = MagicMock(spec=discord.Client)
+    b.get_guild.return_value = guild
+    return b
+
+
+@pytest.fixture
+def cog(bot, monkeypatch):
+    monkeypatch.setattr(config, "GUILD_ID", GUILD_ID, False)
+    monkeypatch.setattr(config, "PING_SCHEDULES", [], False)
+    return Scheduling(bot)
+
+
+def _load(cog, monkeypatch, *schedules):
+    monkeypatch.setattr(config, "PING_SCHEDULES", list(schedules), False)
+    cog._build_events(datetime.now(EASTERN_TIMEZONE))
+
+
+def _make_due(cog, *mows):
+    # pull the given slots' next fire into the past
+    past = time.time() - 1
+    cog._events = [(past if mow in mows else at, mow) for at, mow in cog._events]
+    cog._events.sort()
+
+
+# ---------- _fire_due ----------
+
+
+@pytest.mark.asyncio
+async def test_due_slot_fires_and_moves_to_next_week(cog, channels, monkeypatch):
+    pings = channels[10] = _channel(10, "pings")
+    due = PingSchedule(1, 10, 9, 0, days=[0], msg="monday")
+    later = PingSchedule(2, 10, 9, 0, days=[3], msg="thursday")
+    _load(cog, monkeypatch, due, later)
+    due_mow, later_mow = 9 * 60, 3 * 1440 + 9 * 60
+    later_at = {mow: at for at, mow in cog._events}[later_mow]
+    _make_due(cog, due_mow)
+
+    await cog._fire_due()
+
+    pings.send.assert_awaited_once_with(due.ping_text)
+    fire_at = {mow: at for at, mow in cog._events}
+    # rescheduled for its next weekly occurrence; the other slot is untouched
+    assert time.time() < fire_at[due_mow] <= time.time() + 7 * 86400
+    assert fire_at[later_mow] == later_at
+    assert len(cog._events) == 2
+
+
+@pytest.mark.asyncio
+async def test_excluded_channels_are_not_purged(cog, channels, monkeypatch):
+    kept = channels[20] = _channel(20, "kept")
+    purged = channels[21] = _channel(21, "purged")
+    cog._excluded_channels = frozenset({20})
+    _load(
+        cog,
+        monkeypatch,
+        PingSchedule(1, 20, 9, 0, [0], "x", delete_hour=10, delete_min=0),
+        PingSchedule(1, 21, 9, 0, [0], "y", delete_hour=10, delete_min=0),
+    )
+    _make_due(cog, 10 * 60)
+
+    await cog._fire_due()
+
+    kept.purge.assert_not_awaited()
+    purged.purge.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_batched_send_errors_are_logged_per_channel(cog, channels, monkeypatch):
+    forbidden = channels[30] = _channel(30, "forbidden")
+    broken = channels[31] = _channel(31, "broken")
+    ok = channels[32] = _channel(32, "ok")
+    forbidden.send.side_effect = discord.Forbidden(MagicMock(status=403), "nope")
+    broken.send.side_effect = RuntimeError("boom")
+    _load(
+        cog,
+        monkeypatch,
+        *(PingSchedule(1, ch_id, 9, 0, [0], "x") for ch_id in (30, 31, 32)),
+    )
+    _make_due(cog, 9 * 60)
+    log = MagicMock()
+    monkeypatch.setattr("cogs.scheduling.logger", log)
+
+    await cog._fire_due()
+
+    # one failure doesn't stop the batch, and each is reported against its channel
+    ok.send.assert_awaited_once()
+    errors = [c.args for c in log.error.call_args_list]
+    assert ("Missing permissions to %s in #%s", "send ping", "forbidden") in errors
+    assert ("Failed to %s in #%s", "send ping", "broken") in errors
+    assert len(errors) == 2
+
+
+# ---------- _purge ----------
+
+
+@pytest.mark.asyncio
+async def test_purges_of_one_channel_are_spaced(cog, monkeypatch):
+    monkeypatch.setattr("cogs.scheduling.PURGE_MIN_INTERVAL", 0.05)
+    loop = asyncio.get_running_loop()
+    started: dict[str, list[float]] = {"a": [], "b": []}
+
+    def _purging(name):
+        async def purge(**_):
+            started[name].append(loop.time())
+            return []
+
+        return purge
+
+    a, b = _channel(40, "a"), _channel(41, "b")
+    a.purge.side_effect = _purging("a")
+    b.purge.side_effect = _purging("b")
+    cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+
+    await asyncio.gather(
+        cog._purge(a, cutoff), cog._purge(a, cutoff), cog._purge(b, cutoff)
+    )
+
+    first, second = started["a"]
+    assert second - first >= 0.05
+    # another channel is not held back by a's spacing
+    assert started["b"][0] < second
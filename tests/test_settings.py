@@ -6,7 +6,7 @@ import discord
 from discord.ext import commands
 
 # The module under test
-from cogs.settings import SettingsCog
+from cogs.settings import SettingsCog, _rewards_between
 
 
 async def call_cmd(cmd, cog, *args, **kwargs):
@@ -140,8 +140,9 @@ async def test_purge_messages_sends_confirmation_and_stores_view_message(
 @pytest.mark.asyncio
 async def test_set_cooldown_rejects_negative(cog, interaction):
     await call_cmd(SettingsCog.set_cooldown, cog, interaction, seconds=-10)
-    interaction.followup.send.assert_called_once()
-    assert "cannot be negative" in interaction.followup.send.call_args[0][0]
+    interaction.response.defer.assert_not_awaited()
+    interaction.response.send_message.assert_awaited_once()
+    assert "cannot be negative" in interaction.response.send_message.call_args[0][0]
 
 
 @pytest.mark.asyncio
@@ -163,8 +164,9 @@ async def test_set_cooldown_updates_db_and_cache(cog, interaction):
 @pytest.mark.asyncio
 async def test_set_xprange_rejects_invalid(cog, interaction):
     await call_cmd(SettingsCog.set_xprange, cog, interaction, min_xp=10, max_xp=5)
-    interaction.followup.send.assert_called_once()
-    assert "Invalid XP range" in interaction.followup.send.call_args[0][0]
+    interaction.response.defer.assert_not_awaited()
+    interaction.response.send_message.assert_awaited_once()
+    assert "Invalid XP range" in interaction.response.send_message.call_args[0][0]
 
 
 @pytest.mark.asyncio
@@ -190,7 +192,10 @@ async def test_removeallxp_no_xp(cog, interaction):
     member.roles = []
 
     # Patch the EXACT attribute your cog uses (likely "db")
-    with patch("cogs.settings.database.get_user", new=AsyncMock(return_value=None)):
+    with patch(
+        "cogs.settings.database.adjust_user_xp",
+        new=AsyncMock(return_value=(0, 0, 0, 0)),
+    ):
         await call_cmd(SettingsCog.removeallxp, cog, interaction, member)
 
     interaction.followup.send.assert_called_once()
@@ -214,12 +219,9 @@ async def test_removeallxp_clears_db_and_removes_roles(cog, interaction, monkeyp
     interaction.guild.get_role.return_value = r
 
     with patch(
-        "cogs.settings.database.get_user", new=AsyncMock(return_value=(1234, 10))
-    ), patch(
-        "cogs.settings.database.set_user_xp_and_level", new=AsyncMock()
-    ) as set_user, patch(
-        "cogs.settings.build_xp_status"
-    ) as build_status:
+        "cogs.settings.database.adjust_user_xp",
+        new=AsyncMock(return_value=(1234, 10, 0, 0)),
+    ) as adjust, patch("cogs.settings.build_xp_status") as build_status:
 
         status = MagicMock()
         status.total_xp = 0
@@ -231,7 +233,10 @@ async def test_removeallxp_clears_db_and_removes_roles(cog, interaction, monkeyp
         await call_cmd(SettingsCog.removeallxp, cog, interaction, member)
 
         # Because production awaits this, assert awaited:
-        set_user.assert_awaited_once_with(member.id, interaction.guild.id, 0, 0)
+        # XP and level are reset by the one RPC call
+        adjust.assert_awaited_once_with(
+            member.id, interaction.guild.id, 0, reset=True
+        )
 
     member.remove_roles.assert_awaited_once()  # it’s an AsyncMock
     interaction.followup.send.assert_called_once()
@@ -256,28 +261,45 @@ async def test_addxp_awards_roles_and_updates_db(cog, interaction, monkeypatch):
     monkeypatch.setattr("cogs.settings.config.ROLE_REWARDS", {5: role.id}, raising=True)
 
     with patch(
-        "cogs.settings.database.get_user", new=AsyncMock(return_value=(10, 0))
-    ), patch(
-        "cogs.settings.database.set_user_xp_and_level", new=AsyncMock()
-    ) as set_user, patch(
-        "cogs.settings.build_xp_status"
-    ) as build_status, patch(
-        "cogs.settings.level_from_xp", return_value=1
-    ):
-
-        status = MagicMock()
-        status.total_xp = 999
-        status.level = 5
-        status.xp_into_level = 10
-        status.xp_to_next = 100
-        build_status.return_value = status
-
+        "cogs.settings.database.adjust_user_xp",
+        new=AsyncMock(return_value=(10, 0, 999, 5)),
+    ) as adjust, patch("cogs.settings.level_from_xp", return_value=1):
         await call_cmd(SettingsCog.addxp, cog, interaction, member, amount=989)
 
-        set_user.assert_awaited_once_with(member.id, interaction.guild.id, 999, 5)
+        # XP and level are written by the one RPC call
+        adjust.assert_awaited_once_with(member.id, interaction.guild.id, 989)
 
     member.add_roles.assert_awaited_once()
     interaction.followup.send.assert_called_once()
+    assert "1 → 5" in interaction.followup.send.call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_addxp_grants_crossed_roles_in_one_call(cog, interaction, monkeypatch):
+    member = MagicMock(spec=discord.Member)
+    member.mention = "@mem"
+    member.add_roles = AsyncMock()
+    member.id = 99
+
+    roles = {}
+    for role_id, name in ((222, "Bronze"), (223, "Silver")):
+        role = MagicMock(spec=discord.Role)
+        role.id, role.name = role_id, name
+        roles[role_id] = role
+    interaction.guild.get_role.side_effect = roles.get
+
+    monkeypatch.setattr(
+        "cogs.settings.config.ROLE_REWARDS", {2: 222, 4: 223}, raising=True
+    )
+
+    with patch(
+        "cogs.settings.database.adjust_user_xp",
+        new=AsyncMock(return_value=(10, 0, 999, 5)),
+    ), patch("cogs.settings.level_from_xp", return_value=1):
+        await call_cmd(SettingsCog.addxp, cog, interaction, member, amount=989)
+
+    member.add_roles.assert_awaited_once()
+    assert member.add_roles.await_args.args == (roles[222], roles[223])
 
 
 # ------------- removexp -----------------
@@ -300,25 +322,26 @@ async def test_removexp_drops_roles_and_updates_db(cog, interaction, monkeypatch
     monkeypatch.setattr("cogs.settings.config.ROLE_REWARDS", {3: role.id}, raising=True)
 
     with patch(
-        "cogs.settings.database.get_user", new=AsyncMock(return_value=(250, 3))
-    ), patch(
-        "cogs.settings.database.set_user_xp_and_level", new=AsyncMock()
-    ) as set_user, patch(
-        "cogs.settings.build_xp_status"
-    ) as build_status, patch(
-        "cogs.settings.level_from_xp", return_value=3
-    ):
-
-        status = MagicMock()
-        status.total_xp = 100
-        status.level = 2
-        status.xp_into_level = 20
-        status.xp_to_next = 50
-        build_status.return_value = status
-
+        "cogs.settings.database.adjust_user_xp",
+        new=AsyncMock(return_value=(250, 3, 100, 2)),
+    ) as adjust, patch("cogs.settings.level_from_xp", return_value=3):
         await call_cmd(SettingsCog.removexp, cog, interaction, member, amount=150)
 
-        set_user.assert_awaited_once_with(member.id, interaction.guild.id, 100, 2)
+        # XP and level are written by the one RPC call
+        adjust.assert_awaited_once_with(member.id, interaction.guild.id, -150)
 
     member.remove_roles.assert_awaited_once()
     interaction.followup.send.assert_called_once()
+
+
+def test_rewards_between_slices_sorted_thresholds(monkeypatch):
+    monkeypatch.setattr(
+        "cogs.settings.config.ROLE_REWARDS", {10: 3, 1: 1, 5: 2}, raising=True
+    )
+    assert _rewards_between(0, 5) == [(1, 1), (5, 2)]
+    assert _rewards_between(5, 10) == [(10, 3)]
+    assert _rewards_between(4, 4) == []
+
+    # a replaced mapping is picked up on the next call
+    monkeypatch.setattr("cogs.settings.config.ROLE_REWARDS", {2: 7}, raising=True)
+    assert _rewards_between(0, 99) == [(2, 7)]